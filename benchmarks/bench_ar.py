@@ -0,0 +1,89 @@
+# Receivables reports read from the rollups against the same figures
+# aggregated straight from the billing table.
+#
+# Seeds --bills bills spread over four years and a mix of plans, about a
+# fifth of them unpaid (as manual bills, so one seed customer can hold them), then times fetch_ar_report against equivalent
+# GROUP BY queries over billing. The rollups are filled by the triggers while
+# seeding, so the seeding time includes their upkeep.
+#
+#   python -m benchmarks.bench_ar [--bills 10000000] [--repeat 5]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from isp_core import DBConfig, fetch_ar_report, migrate
+
+SCAN_QUERIES = [
+    '''
+    SELECT CASE WHEN days IS NULL THEN 5 WHEN days <= 0 THEN 0 WHEN days <= 30 THEN 1
+                WHEN days <= 60 THEN 2 WHEN days <= 90 THEN 3 ELSE 4 END AS bucket,
+           COUNT(*), SUM(amount)
+    FROM (SELECT julianday('now') - julianday(due_date) AS days, amount FROM billing WHERE paid = 0)
+    GROUP BY bucket
+    ''',
+    '''
+    SELECT plan_id, COUNT(*), SUM(amount), SUM(paid), SUM(paid * amount)
+    FROM billing WHERE COALESCE(billing_period, substr(due_date, 1, 7)) = :period
+    GROUP BY plan_id
+    ''',
+    '''
+    SELECT COALESCE(billing_period, substr(due_date, 1, 7)) AS month, SUM(amount), SUM(paid * amount)
+    FROM billing GROUP BY month HAVING month BETWEEN :first AND :period
+    ''',
+]
+
+def seed(conn, bills):
+    rng = random.Random(11)
+    start = datetime(2022, 1, 1)
+    conn.executemany('INSERT INTO plans (name, speed, price) VALUES (?, ?, ?)',
+                     [(f"Plan {i}", f"{i * 50} Mbps", 10.0 * i) for i in range(1, 11)])
+    conn.execute("INSERT INTO customers (name, address, phone, email) VALUES ('Seed', '-', '-', '-')")
+    
+    def rows():
+        for _ in range(bills):
+            plan_id = rng.randint(1, 10)
+            due = start + timedelta(days=rng.randrange(4 * 365))
+            paid = rng.random() > 0.2
+            yield (1, 10.0 * plan_id, due.strftime('%Y-%m-%d'), int(paid),
+                   due.strftime('%Y-%m-%d') if paid else None, plan_id)
+    
+    conn.executemany(
+        'INSERT INTO billing (customer_id, amount, due_date, paid, payment_date, plan_id) '
+        'VALUES (?, ?, ?, ?, ?, ?)', rows())
+    conn.commit()
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Receivables report benchmark")
+    parser.add_argument('--bills', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--period', default='2024-06')
+    args = parser.parse_args()
+    first = f"{int(args.period[:4]) - 1}{args.period[4:]}"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        start = time.perf_counter()
+        seed(conn, args.bills)
+        print(f"Seeded {args.bills} bills in {time.perf_counter() - start:.1f}s")
+        
+        rollup = timed(lambda: fetch_ar_report(conn, args.period), args.repeat)
+        scan = timed(lambda: [conn.execute(sql, {'period': args.period, 'first': first}).fetchall()
+                              for sql in SCAN_QUERIES], 1)
+        conn.close()
+    
+    print(f"report from rollups: {rollup * 1000:10.1f} ms")
+    print(f"aggregated from billing: {scan * 1000:6.0f} ms ({scan / rollup:.0f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Monthly billing run against the one-bill-at-a-time path.
+#
+# Seeds a database with --customers subscribers, then bills a sample of them
+# through insert_bill (one INSERT and commit per customer, which is what the
+# Generate Bill button does) and bills everybody with generate_billing_cycle.
+# The per-bill path is timed on a sample and extrapolated, since running it
+# for every customer takes minutes. A second run of the same period shows
+# that repeated runs create nothing.
+#
+#   python -m benchmarks.bench_billing [--customers 500000] [--sample 10000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from isp_core import DBConfig, generate_billing_cycle, insert_bill, migrate
+
+def seed(conn, customers):
+    rng = random.Random(7)
+    conn.executemany(
+        'INSERT INTO plans (name, speed, price) VALUES (?, ?, ?)',
+        [(f"Plan {i}", f"{i * 50} Mbps", 10.0 * i) for i in range(1, 11)])
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"Customer {i}", "Main Street", "555", "c@example.com",
+          rng.randint(1, 10), "2024-01-01 00:00:00") for i in range(customers)))
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly billing run benchmark")
+    parser.add_argument('--customers', type=int, default=500_000)
+    parser.add_argument('--sample', type=int, default=10_000,
+                        help="customers billed one by one for the baseline")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        seed(conn, args.customers)
+        
+        plans = dict(conn.execute('SELECT plan_id, price FROM plans'))
+        sample = conn.execute('SELECT customer_id, plan_id FROM customers LIMIT ?',
+                              (args.sample,)).fetchall()
+        start = time.perf_counter()
+        for customer_id, plan_id in sample:
+            insert_bill(conn, customer_id, plans[plan_id], '2024-01-28')
+        per_bill = (time.perf_counter() - start) / len(sample)
+        
+        start = time.perf_counter()
+        created = generate_billing_cycle(conn, '2024-02', '2024-02-28')
+        bulk = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        repeated = generate_billing_cycle(conn, '2024-02', '2024-02-28')
+        rerun = time.perf_counter() - start
+        conn.close()
+    
+    print(f"one by one:  {per_bill * 1e6:8.1f} us/bill, "
+          f"~{per_bill * args.customers:.1f}s for {args.customers} customers (extrapolated)")
+    print(f"billing run: {bulk / created * 1e6:8.1f} us/bill, "
+          f"{bulk:.1f}s for {created} bills ({per_bill * created / bulk:.0f}x)")
+    print(f"second run:  {rerun:.1f}s, {repeated} bills created")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Auto dispatch solver on a synthetic city.
+#
+# Scatters --jobs open complaints and --technicians bases over a square city
+# grid of --size km (from a fixed seed, so runs are comparable), gives every
+# technician a few visits already booked, and plans the day with
+# plan_dispatch. A round-robin assignment that takes jobs in the same order
+# is run as the baseline for jobs placed and minutes spent driving.
+#
+#   python -m benchmarks.bench_dispatch [--jobs 500] [--technicians 40] [--size 20]
+
+import argparse
+import math
+import random
+import time
+
+from isp_core import DISPATCH_VISIT_MINUTES, earliest_slot, plan_dispatch, travel_minutes
+
+# City centre; grid offsets in km are converted to degrees around it
+ORIGIN = (28.6, 77.2)
+
+def grid_point(rng, size):
+    north, east = rng.uniform(0, size), rng.uniform(0, size)
+    return (ORIGIN[0] + north / 111.32,
+            ORIGIN[1] + east / (111.32 * math.cos(math.radians(ORIGIN[0]))))
+
+def city(jobs, technicians, size, seed):
+    rng = random.Random(seed)
+    job_list = [(job_id, grid_point(rng, size)) for job_id in range(1, jobs + 1)]
+    crew = []
+    for technician_id in range(1, technicians + 1):
+        shift_start = rng.choice([8, 9, 10]) * 60
+        busy = []
+        for hour in sorted(rng.sample(range(shift_start // 60, shift_start // 60 + 8), 2)):
+            busy.append((hour * 60, hour * 60 + DISPATCH_VISIT_MINUTES))
+        crew.append((technician_id, grid_point(rng, size), shift_start, shift_start + 8 * 60, busy))
+    return job_list, crew
+
+def round_robin(jobs, technicians, duration=DISPATCH_VISIT_MINUTES):
+    # Next technician in turn takes the job at the end of their route
+    routes = [[technician_id, location, shift_start, shift_end, busy]
+              for technician_id, location, shift_start, shift_end, busy in technicians]
+    assignments = []
+    unassigned = []
+    turn = 0
+    for job_id, location in jobs:
+        for attempt in range(len(routes)):
+            route = routes[(turn + attempt) % len(routes)]
+            travel = travel_minutes(route[1], location)
+            start = earliest_slot(route[4], route[2] + travel, duration, route[3])
+            if start is not None:
+                route[1], route[2] = location, start + duration
+                assignments.append((job_id, route[0], start, start + duration, travel))
+                turn = (turn + attempt + 1) % len(routes)
+                break
+        else:
+            unassigned.append(job_id)
+    return assignments, unassigned
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto dispatch solver benchmark")
+    parser.add_argument('--jobs', type=int, default=500)
+    parser.add_argument('--technicians', type=int, default=40)
+    parser.add_argument('--size', type=float, default=20.0, help="city width in km")
+    parser.add_argument('--seed', type=int, default=16)
+    args = parser.parse_args()
+    
+    jobs, technicians = city(args.jobs, args.technicians, args.size, args.seed)
+    print(f"{args.jobs} jobs, {args.technicians} technicians, {args.size:g} km city\n")
+    
+    print(f"{'solver':<14}{'time (ms)':>12}{'placed':>10}{'unplaced':>10}{'travel (min)':>15}{'per visit':>11}")
+    for label, solver in (("round robin", round_robin), ("greedy", plan_dispatch)):
+        start = time.perf_counter()
+        assignments, unassigned = solver(jobs, technicians)
+        elapsed = (time.perf_counter() - start) * 1000
+        travel = sum(assignment[4] for assignment in assignments)
+        per_visit = travel / len(assignments) if assignments else 0
+        print(f"{label:<14}{elapsed:>12.1f}{len(assignments):>10}{len(unassigned):>10}"
+              f"{travel:>15}{per_visit:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Dunning run over a ledger with many overdue bills.
+#
+# Seeds --bills bills due over the past year, a quarter of them paid, runs
+# the dunning job, runs it again the same day (nothing should change) and
+# once more a month later, when bills move on to later stages.
+#
+#   python -m benchmarks.bench_dunning [--bills 500000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from isp_core import DBConfig, migrate, run_dunning
+
+def seed(conn, bills, today):
+    rng = random.Random(5)
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email) VALUES (?, ?, ?, ?)',
+        ((f"Customer {i}", "Main Street", "555", f"c{i}@example.com") for i in range(bills // 10)))
+    conn.executemany(
+        'INSERT INTO billing (customer_id, amount, due_date, paid) VALUES (?, ?, ?, ?)',
+        ((rng.randint(1, bills // 10), 20.0 * rng.randint(1, 5),
+          (today - timedelta(days=rng.randrange(365))).strftime('%Y-%m-%d'), int(rng.random() < 0.25))
+         for _ in range(bills)))
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Dunning run benchmark")
+    parser.add_argument('--bills', type=int, default=500_000)
+    args = parser.parse_args()
+    today = datetime(2024, 6, 30)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        seed(conn, args.bills, today)
+        
+        for label, as_of in (("first run", today), ("same day again", today),
+                             ("a month later", today + timedelta(days=30))):
+            start = time.perf_counter()
+            moved, queued = run_dunning(conn, as_of.strftime('%Y-%m-%d'))
+            print(f"{label:<16}{time.perf_counter() - start:>8.2f}s  "
+                  f"{moved:>8} bills moved{queued:>8} notices queued")
+        conn.close()
+
+if __name__ == '__main__':
+    main()
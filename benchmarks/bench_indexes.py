@@ -0,0 +1,99 @@
+# Query timings before and after the secondary-index migration.
+#
+# Builds a synthetic database with the base schema only (user_version 1),
+# times the lookups the application runs, applies the remaining migrations
+# and times the same queries again.
+#
+#   python -m benchmarks.bench_indexes [--rows 1000000]
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from isp_core import migrate
+
+QUERIES = [
+    ("customer by name",
+     'SELECT customer_id FROM customers WHERE name=?', lambda n: (f"Customer {n // 2}",)),
+    ("complaints by customer",
+     'SELECT * FROM complaints WHERE customer_id=?', lambda n: (n // 3,)),
+    ("bills by customer",
+     'SELECT * FROM billing WHERE customer_id=?', lambda n: (n // 4,)),
+    ("resolved complaints",
+     "SELECT COUNT(*) FROM complaints WHERE status = 'Resolved'", lambda n: ()),
+    ("customers on plan",
+     'SELECT COUNT(*) FROM customers WHERE plan_id=?', lambda n: (3,)),
+    ("latest customers",
+     'SELECT name, registration_date FROM customers ORDER BY registration_date DESC LIMIT 5',
+     lambda n: ()),
+    ("latest complaints",
+     'SELECT complaint_id, date FROM complaints ORDER BY date DESC LIMIT 5', lambda n: ()),
+]
+
+def populate(conn, rows):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO plans (name, speed, price, data_limit, description) VALUES (?, ?, ?, ?, ?)',
+        [(f"Plan {i}", f"{i * 50} Mbps", 10.0 * i, "Unlimited", "") for i in range(1, 11)])
+    cursor.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"Customer {i}", f"{i} Main Street", f"555-{i:07d}", f"c{i}@example.com",
+          rng.randint(1, 10), (start + timedelta(minutes=rng.randrange(2_000_000))).strftime('%Y-%m-%d %H:%M:%S'))
+         for i in range(rows)))
+    cursor.executemany(
+        'INSERT INTO complaints (customer_id, description, date, status) VALUES (?, ?, ?, ?)',
+        ((rng.randint(1, rows), "Connection drops", (start + timedelta(minutes=rng.randrange(2_000_000))).strftime('%Y-%m-%d %H:%M:%S'),
+          rng.choice(['Open', 'In Progress', 'Resolved'])) for _ in range(rows)))
+    cursor.executemany(
+        'INSERT INTO billing (customer_id, amount, due_date, paid) VALUES (?, ?, ?, ?)',
+        ((rng.randint(1, rows), 10.0 * rng.randint(1, 10), (start + timedelta(days=rng.randrange(1500))).strftime('%Y-%m-%d'),
+          rng.randint(0, 1)) for _ in range(rows)))
+    conn.commit()
+
+def time_queries(conn, rows, repeat):
+    timings = {}
+    for label, sql, params in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params(rows)).fetchall()
+        timings[label] = (time.perf_counter() - start) / repeat
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Index migration query benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help="rows per table in the synthetic dataset")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        migrate(conn, target=1)
+        
+        start = time.perf_counter()
+        populate(conn, args.rows)
+        print(f"Populated {args.rows} rows per table in {time.perf_counter() - start:.1f}s")
+        
+        before = time_queries(conn, args.rows, args.repeat)
+        
+        start = time.perf_counter()
+        migrate(conn)
+        print(f"Applied index migration in {time.perf_counter() - start:.1f}s\n")
+        
+        after = time_queries(conn, args.rows, args.repeat)
+        conn.close()
+    
+    print(f"{'query':<26}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for label, _, _ in QUERIES:
+        b, a = before[label] * 1000, after[label] * 1000
+        print(f"{label:<26}{b:>14.2f}{a:>14.2f}{b / a if a else float('inf'):>9.0f}x")
+
+if __name__ == '__main__':
+    main()
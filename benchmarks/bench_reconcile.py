@@ -0,0 +1,89 @@
+# Bank statement reconciliation against settling bills one at a time.
+#
+# Seeds --customers customers with two open bills each and writes a
+# statement of --payments payments: most name their bill, some only match on
+# customer and amount and a few match nothing. The statement is reconciled
+# in one pass; the one-at-a-time path (look the bill up, then pay_bill,
+# which commits per bill like Mark as Paid) is timed on a sample and
+# extrapolated.
+#
+#   python -m benchmarks.bench_reconcile [--customers 200000] [--payments 50000]
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from isp_core import DBConfig, migrate, pay_bill, reconcile_payments
+
+def seed(conn, customers):
+    rng = random.Random(9)
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email) VALUES (?, ?, ?, ?)',
+        ((f"Customer {i}", "Main Street", "555", f"c{i}@example.com") for i in range(customers)))
+    conn.executemany(
+        'INSERT INTO billing (customer_id, amount, due_date) VALUES (?, ?, ?)',
+        ((customer_id, 10.0 * rng.randint(1, 9), due_date)
+         for customer_id in range(1, customers + 1) for due_date in ('2024-05-28', '2024-06-28')))
+    conn.commit()
+
+def write_statement(conn, path, payments):
+    rng = random.Random(10)
+    bills = conn.execute('SELECT bill_id, customer_id, amount FROM billing WHERE paid = 0').fetchall()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['customer_id', 'amount', 'reference', 'date'])
+        for number, (bill_id, customer_id, amount) in enumerate(rng.sample(bills, payments)):
+            kind = rng.random()
+            if kind < 0.8:
+                reference = f"BILL-{bill_id}"
+            elif kind < 0.95:
+                reference = f"TX{number}"
+            else:
+                reference, amount = f"TX{number}", amount + 0.5
+            writer.writerow([customer_id, f"{amount:.2f}", reference, '2024-07-01'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Payment reconciliation benchmark")
+    parser.add_argument('--customers', type=int, default=200_000)
+    parser.add_argument('--payments', type=int, default=50_000)
+    parser.add_argument('--sample', type=int, default=2000,
+                        help="payments settled one by one for the baseline")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        seed(conn, args.customers)
+        statement = os.path.join(tmp, 'statement.csv')
+        write_statement(conn, statement, args.payments)
+        
+        sample = conn.execute('SELECT customer_id, amount FROM billing WHERE paid = 0 ORDER BY random() LIMIT ?',
+                              (args.sample,)).fetchall()
+        start = time.perf_counter()
+        for customer_id, amount in sample:
+            bill_id = next(bill_id for bill_id, bill_amount, paid in conn.execute('''
+            SELECT bill_id, amount, paid FROM billing WHERE customer_id=? ORDER BY due_date
+            ''', (customer_id,)) if bill_amount == amount and not paid)
+            pay_bill(conn, bill_id)
+        per_payment = (time.perf_counter() - start) / len(sample)
+        
+        start = time.perf_counter()
+        matched, exceptions, _ = reconcile_payments(conn, statement)
+        bulk = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        rematched, _, _ = reconcile_payments(conn, statement, os.path.join(tmp, 'again.csv'))
+        rerun = time.perf_counter() - start
+        conn.close()
+    
+    print(f"one by one:   {per_payment * 1e6:8.1f} us/payment, "
+          f"~{per_payment * args.payments:.1f}s for {args.payments} payments (extrapolated)")
+    print(f"reconcile:    {bulk / args.payments * 1e6:8.1f} us/payment, {bulk:.1f}s, "
+          f"{matched} matched, {exceptions} exceptions ({per_payment * args.payments / bulk:.0f}x)")
+    print(f"second run:   {rerun:.1f}s, {rematched} matched")
+
+if __name__ == '__main__':
+    main()
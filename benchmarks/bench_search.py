@@ -0,0 +1,73 @@
+# Customer search with FTS5 against a LIKE scan.
+#
+# Builds a synthetic customer table, then times the search box query for a
+# few typed strings against the equivalent LIKE '%text%' filter over name,
+# address, phone and email. LIKE stops at the first SEARCH_LIMIT rows it
+# finds and does not rank them, so it is only competitive for common words.
+#
+#   python -m benchmarks.bench_search [--rows 1000000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from isp_core import SEARCH_CANDIDATES, SEARCH_LIMIT, DBConfig, fts_query, migrate
+
+FIRST = ["Asha", "Rahul", "Priya", "Vikram", "Neha", "Arjun", "Kavya", "Rohan", "Sneha", "Amit"]
+LAST = ["Sharma", "Verma", "Gupta", "Singh", "Patel", "Iyer", "Reddy", "Nair", "Joshi", "Mehta"]
+STREETS = ["MG Road", "Park Street", "Station Road", "Lake View", "Nehru Nagar", "Civil Lines"]
+
+FTS_SQL = f'''
+SELECT c.customer_id, c.name
+FROM (SELECT rowid, rank FROM customers_fts WHERE customers_fts MATCH ?
+      LIMIT {SEARCH_CANDIDATES}) f
+JOIN customers c ON c.customer_id = f.rowid
+ORDER BY f.rank LIMIT {SEARCH_LIMIT}
+'''
+
+LIKE_SQL = f'''
+SELECT customer_id, name FROM customers
+WHERE name LIKE ?1 OR address LIKE ?1 OR phone LIKE ?1 OR email LIKE ?1
+LIMIT {SEARCH_LIMIT}
+'''
+
+def populate(conn, rows):
+    rng = random.Random(11)
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+        'VALUES (?, ?, ?, ?, NULL, ?)',
+        ((f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}", f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+          f"98{rng.randrange(10 ** 8):08d}", f"user{i}@example.com", "2024-01-01 00:00:00")
+         for i in range(rows)))
+    conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    searches = ["Priya", "Priya Nair", "park str", "user12345", str(args.rows // 2)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        start = time.perf_counter()
+        populate(conn, args.rows)
+        print(f"Populated {args.rows} customers in {time.perf_counter() - start:.1f}s\n")
+        
+        print(f"{'search':<22}{'hits':>6}{'LIKE (ms)':>12}{'FTS5 (ms)':>12}")
+        for text in searches:
+            timings = []
+            for sql, params in ((LIKE_SQL, (f"%{text}%",)), (FTS_SQL, (fts_query(text),))):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    hits = conn.execute(sql, params).fetchall()
+                timings.append((time.perf_counter() - start) / args.repeat * 1000)
+            print(f"{text:<22}{len(hits):>6}{timings[0]:>12.2f}{timings[1]:>12.2f}")
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Timings for the isp_core services at several table sizes.
+#
+# For each size a fresh database gets that many customers, complaints and
+# bills through the bulk service methods, then the common operations are
+# timed: paging through a table, single-row lookups, bulk updates and a
+# billing run. Every size runs in its own temporary database.
+#
+#   python -m benchmarks.bench_services [--sizes 10000 100000 1000000] [--lookups 1000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from isp_core import (BillingService, ComplaintService, CustomerService, DBConfig,
+                      PlanService, migrate)
+
+def timed(results, label, rows, fn, *args):
+    # rows is how many rows the operation touches, None for lookups
+    start = time.perf_counter()
+    value = fn(*args)
+    results.append((label, time.perf_counter() - start, rows))
+    return value
+
+def run(size, lookups, tmp):
+    rng = random.Random(3)
+    conn = DBConfig(database=os.path.join(tmp, f'services_{size}.db')).connect()
+    migrate(conn)
+    customers, plans = CustomerService(conn), PlanService(conn)
+    complaints, billing = ComplaintService(conn), BillingService(conn)
+    results = []
+    
+    plans.add_many((f"Plan {i}", f"{i * 50} Mbps", 10.0 * i, "Unlimited", "") for i in range(1, 11))
+    timed(results, "customers.add_many", size, customers.add_many,
+          ((f"Customer {i}", f"{i} Main Street", f"555-{i:07d}", f"c{i}@example.com", rng.randint(1, 10))
+           for i in range(size)))
+    timed(results, "complaints.add_many", size, complaints.add_many,
+          ((rng.randint(1, size), "Connection drops") for _ in range(size)))
+    timed(results, "billing.add_many", size, billing.add_many,
+          ((rng.randint(1, size), 20.0, '2024-01-28') for _ in range(size)))
+    
+    timed(results, "customers.scan", size, lambda: sum(1 for _ in customers.scan()))
+    ids = [rng.randint(1, size) for _ in range(lookups)]
+    timed(results, f"customers.get x{lookups}", None, lambda: [customers.get(i) for i in ids])
+    timed(results, f"billing.for_customer x{lookups}", None, lambda: [billing.for_customer(i) for i in ids])
+    
+    sample = range(1, size + 1, 2)
+    timed(results, "billing.pay_many (half)", len(sample), billing.pay_many, sample)
+    timed(results, "complaints.close_many (half)", len(sample), complaints.close_many, sample, "Fixed")
+    timed(results, "billing.run_cycle", size, billing.run_cycle, '2024-02', '2024-02-28')
+    conn.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="isp_core service benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="rows per table")
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            print(f"\n{size} rows")
+            print(f"{'operation':<34}{'seconds':>10}{'rows/s':>14}")
+            for label, seconds, rows in run(size, args.lookups, tmp):
+                rate = f"{rows / seconds:>14.0f}" if rows else ''
+                print(f"{label:<34}{seconds:>10.3f}{rate}")
+
+if __name__ == '__main__':
+    main()
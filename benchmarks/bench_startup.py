@@ -0,0 +1,83 @@
+# Time to first paint of the desktop application against database size.
+#
+# Seeds databases of growing size, then starts the application on each and
+# times three points: the window drawn, the startup queries finished (the
+# dashboard filled in), and every tab opened once, which is roughly what an
+# eager startup used to pay before the window appeared. Needs a display.
+#
+#   python -m benchmarks.bench_startup [--sizes 10000 100000 500000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tkinter as tk
+
+from ISP_SYSTEM import ISPAutomationSystem
+from isp_core import DBConfig, migrate
+
+def seed(path, customers):
+    rng = random.Random(19)
+    conn = DBConfig(database=path).connect()
+    migrate(conn)
+    conn.executemany(
+        'INSERT INTO plans (name, speed, price) VALUES (?, ?, ?)',
+        [(f"Plan {i}", f"{i * 50} Mbps", 10.0 * i) for i in range(1, 11)])
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"Customer {i}", f"{i} Main Street", "555", "c@example.com",
+          rng.randint(1, 10), "2024-01-01 00:00:00") for i in range(customers)))
+    conn.executemany(
+        "INSERT INTO complaints (customer_id, description, date, status) VALUES (?, 'Slow', ?, ?)",
+        ((rng.randint(1, customers), "2024-02-01 10:00:00", rng.choice(['Open', 'Resolved']))
+         for _ in range(customers // 2)))
+    conn.executemany(
+        'INSERT INTO billing (customer_id, amount, due_date, paid) VALUES (?, 20.0, ?, ?)',
+        ((customer_id, "2024-02-01", rng.randint(0, 1)) for customer_id in range(1, customers + 1)))
+    conn.commit()
+    conn.close()
+
+def settle(root, app):
+    # Process events until the database thread has nothing left to run
+    root.update()
+    while app.db.in_flight:
+        time.sleep(0.005)
+        root.update()
+
+def measure(path):
+    os.environ['ISP_DB_PATH'] = path
+    start = time.perf_counter()
+    root = tk.Tk()
+    app = ISPAutomationSystem(root)
+    root.update()
+    painted = time.perf_counter() - start
+    
+    settle(root, app)
+    ready = time.perf_counter() - start
+    
+    for tab in app.notebook.tabs():
+        app.notebook.select(tab)
+        settle(root, app)
+    all_tabs = time.perf_counter() - start
+    
+    app.on_close()
+    return painted, ready, all_tabs
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                        help="customers in each seeded database")
+    args = parser.parse_args()
+    
+    print(f"{'customers':>10}{'first paint (ms)':>19}{'dashboard (ms)':>17}{'all tabs (ms)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'startup_{size}.db')
+            seed(path, size)
+            painted, ready, all_tabs = measure(path)
+            print(f"{size:>10}{painted * 1000:>19.0f}{ready * 1000:>17.0f}{all_tabs * 1000:>16.0f}")
+
+if __name__ == '__main__':
+    main()
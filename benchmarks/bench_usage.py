@@ -0,0 +1,71 @@
+# Usage ingestion throughput.
+#
+# Writes a RADIUS-accounting-style CSV of --records interim updates from
+# --customers subscribers over a day, then meters it with ingest_usage (the
+# usage-import path: parse, bucket into hourly slots, flush hourly and daily
+# upserts, flag customers over their limit). The same records are also fed
+# to a UsageMeter from memory, which is what the UDP listener does per line.
+#
+#   python -m benchmarks.bench_usage [--records 1000000] [--customers 50000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from isp_core import DBConfig, UsageMeter, ingest_usage, migrate
+
+def seed(conn, customers):
+    conn.executemany('INSERT INTO plans (name, speed, price, data_limit) VALUES (?, ?, ?, ?)',
+                     [("Basic", "50 Mbps", 20.0, "400 MB"), ("Max", "1 Gbps", 60.0, "Unlimited")])
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id) VALUES (?, ?, ?, ?, ?)',
+        ((f"Customer {i}", "Main Street", "555", f"c{i}@example.com", 1 + i % 2) for i in range(customers)))
+    conn.commit()
+
+def write_records(path, records, customers):
+    rng = random.Random(13)
+    start = 1_717_200_000
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('customer_id,timestamp,bytes_in,bytes_out,session_id\n')
+        for n in range(records):
+            f.write(f"{rng.randint(1, customers)},{start + n * 86400 // records},"
+                    f"{rng.randrange(50_000_000)},{rng.randrange(5_000_000)},s{n % 9973}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Usage ingestion benchmark")
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=50_000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = DBConfig(database=os.path.join(tmp, 'bench.db')).connect()
+        migrate(conn)
+        seed(conn, args.customers)
+        path = os.path.join(tmp, 'usage.csv')
+        write_records(path, args.records, args.customers)
+        
+        start = time.perf_counter()
+        records, rejected, flagged, _ = ingest_usage(conn, path)
+        from_file = time.perf_counter() - start
+        
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()[1:]
+        meter = UsageMeter(conn)
+        start = time.perf_counter()
+        for line in lines:
+            meter.add(*line.split(',')[:4])
+        metered = time.perf_counter() - start
+        start = time.perf_counter()
+        meter.flush()
+        flushed = time.perf_counter() - start
+        conn.close()
+    
+    print(f"usage-import:   {records / from_file:>10.0f} records/s ({from_file:.1f}s, "
+          f"{rejected} rejected, {flagged} customers flagged)")
+    print(f"socket lines:   {len(lines) / metered:>10.0f} records/s buffered, "
+          f"{len(lines) / (metered + flushed):>10.0f} records/s including the flush")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Multi-process read throughput while another process is writing bills.
+#
+# One writer process inserts bills in small transactions while several reader
+# processes page through the billing grid query and read the dashboard
+# counters, all against the same database file. The run is repeated for each
+# journal mode so WAL can be compared against the default rollback journal.
+#
+#   python -m benchmarks.stress_wal [--readers 4] [--seconds 5] [--modes WAL DELETE]
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from isp_core import DBConfig, call_with_retry, fetch_dashboard_counts, migrate
+
+BILLS_PAGE = '''
+SELECT b.bill_id, c.name, b.amount, b.due_date,
+       CASE WHEN b.paid = 1 THEN 'Paid' ELSE 'Unpaid' END as status
+FROM billing b JOIN customers c ON b.customer_id = c.customer_id
+WHERE b.bill_id > ? ORDER BY b.bill_id LIMIT 200
+'''
+
+def seed(config, customers):
+    conn = config.connect()
+    migrate(conn)
+    conn.execute("INSERT INTO plans (name, speed, price) VALUES ('Basic', '50 Mbps', 20.0)")
+    conn.executemany(
+        'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+        'VALUES (?, ?, ?, ?, 1, ?)',
+        ((f"Customer {i}", "Main Street", "555", "c@example.com", "2024-01-01 00:00:00")
+         for i in range(customers)))
+    conn.commit()
+    conn.close()
+
+def writer(config, customers, stop, counts):
+    conn = config.connect()
+    rng = random.Random(1)
+    written = errors = 0
+    
+    def write_batch(conn):
+        conn.executemany(
+            'INSERT INTO billing (customer_id, amount, due_date) VALUES (?, ?, ?)',
+            [(rng.randint(1, customers), 20.0, '2024-02-01') for _ in range(50)])
+        conn.commit()
+    
+    while not stop.is_set():
+        try:
+            call_with_retry(config, conn, write_batch)
+            written += 50
+        except sqlite3.OperationalError:
+            errors += 1
+    counts.put(('writer', written, errors))
+    conn.close()
+
+def reader(config, stop, counts):
+    conn = config.connect()
+    rng = random.Random(os.getpid())
+    reads = errors = 0
+    
+    def read(conn):
+        conn.execute(BILLS_PAGE, (rng.randint(0, 10_000),)).fetchall()
+        fetch_dashboard_counts(conn)
+    
+    while not stop.is_set():
+        try:
+            call_with_retry(config, conn, read)
+            reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    counts.put(('reader', reads, errors))
+    conn.close()
+
+def run(journal_mode, readers, seconds, customers, tmp):
+    config = DBConfig(database=os.path.join(tmp, f'stress_{journal_mode}.db'),
+                      journal_mode=journal_mode, busy_timeout=0.1)
+    seed(config, customers)
+    
+    stop = multiprocessing.Event()
+    counts = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(config, customers, stop, counts))]
+    processes += [multiprocessing.Process(target=reader, args=(config, stop, counts))
+                  for _ in range(readers)]
+    for process in processes:
+        process.start()
+    time.sleep(seconds)
+    stop.set()
+    
+    results = [counts.get() for _ in processes]
+    for process in processes:
+        process.join()
+    
+    reads = sum(r[1] for r in results if r[0] == 'reader')
+    read_errors = sum(r[2] for r in results if r[0] == 'reader')
+    written, write_errors = next((r[1], r[2]) for r in results if r[0] == 'writer')
+    return reads / seconds, read_errors, written / seconds, write_errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent reader/writer stress test")
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--customers', type=int, default=10_000)
+    parser.add_argument('--modes', nargs='+', default=['DELETE', 'WAL'])
+    args = parser.parse_args()
+    
+    print(f"{'journal':<10}{'reads/s':>12}{'read errors':>14}{'bills/s':>12}{'write errors':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            reads, read_errors, written, write_errors = run(
+                mode, args.readers, args.seconds, args.customers, tmp)
+            print(f"{mode:<10}{reads:>12.0f}{read_errors:>14}{written:>12.0f}{write_errors:>14}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2787 @@
+# V.T. ISP System - database and business logic.
+#
+# Everything here runs without Tk: the schema and its migrations, the
+# customer, plan, complaint and billing operations, import/export, billing
+# cycles and technician dispatch. The desktop application in ISP_SYSTEM.py,
+# the command line below and the benchmarks all build on it.
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import re
+import socket
+import sqlite3
+import time
+from array import array
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+# Schema migrations, applied in order. PRAGMA user_version stores how many of
+# them a database has already received, so existing isp_database.db files are
+# upgraded in place the next time the application starts.
+MIGRATIONS = [
+    # 1 - base tables
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS customers (
+            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            address TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            email TEXT NOT NULL,
+            plan_id INTEGER,
+            registration_date TEXT,
+            FOREIGN KEY (plan_id) REFERENCES plans(plan_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS plans (
+            plan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            speed TEXT NOT NULL,
+            price REAL NOT NULL,
+            data_limit TEXT,
+            description TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS complaints (
+            complaint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            resolution TEXT,
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS billing (
+            bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            due_date TEXT NOT NULL,
+            paid INTEGER DEFAULT 0,
+            payment_date TEXT,
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+        ''',
+    ],
+    # 2 - secondary indexes for the lookups, counts and recent-activity feeds
+    [
+        'CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_plan ON customers(plan_id)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_registration ON customers(registration_date, name)',
+        'CREATE INDEX IF NOT EXISTS idx_complaints_customer ON complaints(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints(status)',
+        'CREATE INDEX IF NOT EXISTS idx_complaints_date ON complaints(date)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_customer ON billing(customer_id)',
+    ],
+    # 3 - dashboard counters kept current by triggers
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            customers INTEGER NOT NULL DEFAULT 0,
+            active_customers INTEGER NOT NULL DEFAULT 0,
+            plans INTEGER NOT NULL DEFAULT 0,
+            open_complaints INTEGER NOT NULL DEFAULT 0,
+            resolved_complaints INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS plan_stats (
+            plan_id INTEGER PRIMARY KEY,
+            subscribers INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_plan_stats_subscribers ON plan_stats(subscribers)',
+        '''
+        INSERT OR REPLACE INTO stats (id, customers, active_customers, plans, open_complaints, resolved_complaints)
+        VALUES (1,
+                (SELECT COUNT(*) FROM customers),
+                (SELECT COUNT(*) FROM customers WHERE plan_id IS NOT NULL),
+                (SELECT COUNT(*) FROM plans),
+                (SELECT COUNT(*) FROM complaints WHERE status != 'Resolved'),
+                (SELECT COUNT(*) FROM complaints WHERE status = 'Resolved'))
+        ''',
+        '''
+        INSERT OR REPLACE INTO plan_stats (plan_id, subscribers)
+        SELECT p.plan_id, COUNT(c.customer_id)
+        FROM plans p LEFT JOIN customers c ON p.plan_id = c.plan_id
+        GROUP BY p.plan_id
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_stats_insert AFTER INSERT ON customers
+        BEGIN
+            UPDATE stats SET customers = customers + 1,
+                             active_customers = active_customers + (NEW.plan_id IS NOT NULL)
+            WHERE id = 1;
+            UPDATE plan_stats SET subscribers = subscribers + 1 WHERE plan_id = NEW.plan_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_stats_delete AFTER DELETE ON customers
+        BEGIN
+            UPDATE stats SET customers = customers - 1,
+                             active_customers = active_customers - (OLD.plan_id IS NOT NULL)
+            WHERE id = 1;
+            UPDATE plan_stats SET subscribers = subscribers - 1 WHERE plan_id = OLD.plan_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_stats_update AFTER UPDATE OF plan_id ON customers
+        WHEN OLD.plan_id IS NOT NEW.plan_id
+        BEGIN
+            UPDATE stats SET active_customers = active_customers
+                             + (NEW.plan_id IS NOT NULL) - (OLD.plan_id IS NOT NULL)
+            WHERE id = 1;
+            UPDATE plan_stats SET subscribers = subscribers - 1 WHERE plan_id = OLD.plan_id;
+            UPDATE plan_stats SET subscribers = subscribers + 1 WHERE plan_id = NEW.plan_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_plans_stats_insert AFTER INSERT ON plans
+        BEGIN
+            UPDATE stats SET plans = plans + 1 WHERE id = 1;
+            INSERT OR REPLACE INTO plan_stats (plan_id, subscribers)
+            VALUES (NEW.plan_id, (SELECT COUNT(*) FROM customers WHERE plan_id = NEW.plan_id));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_plans_stats_delete AFTER DELETE ON plans
+        BEGIN
+            UPDATE stats SET plans = plans - 1 WHERE id = 1;
+            DELETE FROM plan_stats WHERE plan_id = OLD.plan_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_stats_insert AFTER INSERT ON complaints
+        BEGIN
+            UPDATE stats SET open_complaints = open_complaints + (NEW.status != 'Resolved'),
+                             resolved_complaints = resolved_complaints + (NEW.status = 'Resolved')
+            WHERE id = 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_stats_delete AFTER DELETE ON complaints
+        BEGIN
+            UPDATE stats SET open_complaints = open_complaints - (OLD.status != 'Resolved'),
+                             resolved_complaints = resolved_complaints - (OLD.status = 'Resolved')
+            WHERE id = 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_stats_update AFTER UPDATE OF status ON complaints
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE stats SET open_complaints = open_complaints
+                             + (NEW.status != 'Resolved') - (OLD.status != 'Resolved'),
+                             resolved_complaints = resolved_complaints
+                             + (NEW.status = 'Resolved') - (OLD.status = 'Resolved')
+            WHERE id = 1;
+        END
+        ''',
+    ],
+    # 4 - monthly billing runs. A customer gets at most one bill per period,
+    # manual bills leave billing_period NULL and are not constrained
+    [
+        'ALTER TABLE billing ADD COLUMN billing_period TEXT',
+        'ALTER TABLE billing ADD COLUMN plan_id INTEGER REFERENCES plans(plan_id)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_billing_period ON billing(customer_id, billing_period)',
+    ],
+    # 5 - full-text search. External-content FTS5 tables index the text
+    # columns in place and triggers keep them in step with their tables.
+    # The prefix indexes serve search-as-you-type queries.
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+            name, address, phone, email,
+            content='customers', content_rowid='customer_id', prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS complaints_fts USING fts5(
+            description, resolution,
+            content='complaints', content_rowid='complaint_id', prefix='2 3'
+        )
+        ''',
+        "INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')",
+        "INSERT INTO complaints_fts (complaints_fts) VALUES ('rebuild')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert AFTER INSERT ON customers
+        BEGIN
+            INSERT INTO customers_fts (rowid, name, address, phone, email)
+            VALUES (NEW.customer_id, NEW.name, NEW.address, NEW.phone, NEW.email);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete AFTER DELETE ON customers
+        BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, address, phone, email)
+            VALUES ('delete', OLD.customer_id, OLD.name, OLD.address, OLD.phone, OLD.email);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update AFTER UPDATE OF name, address, phone, email ON customers
+        BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, address, phone, email)
+            VALUES ('delete', OLD.customer_id, OLD.name, OLD.address, OLD.phone, OLD.email);
+            INSERT INTO customers_fts (rowid, name, address, phone, email)
+            VALUES (NEW.customer_id, NEW.name, NEW.address, NEW.phone, NEW.email);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_fts_insert AFTER INSERT ON complaints
+        BEGIN
+            INSERT INTO complaints_fts (rowid, description, resolution)
+            VALUES (NEW.complaint_id, NEW.description, NEW.resolution);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_fts_delete AFTER DELETE ON complaints
+        BEGIN
+            INSERT INTO complaints_fts (complaints_fts, rowid, description, resolution)
+            VALUES ('delete', OLD.complaint_id, OLD.description, OLD.resolution);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_complaints_fts_update AFTER UPDATE OF description, resolution ON complaints
+        BEGIN
+            INSERT INTO complaints_fts (complaints_fts, rowid, description, resolution)
+            VALUES ('delete', OLD.complaint_id, OLD.description, OLD.resolution);
+            INSERT INTO complaints_fts (rowid, description, resolution)
+            VALUES (NEW.complaint_id, NEW.description, NEW.resolution);
+        END
+        ''',
+    ],
+    # 6 - sort and filter orders of the grids. An index on a column also
+    # orders by rowid, so these serve keyset pages on (column, primary key).
+    [
+        'CREATE INDEX IF NOT EXISTS idx_customers_plan_name ON customers(plan_id, name)',
+        'CREATE INDEX IF NOT EXISTS idx_complaints_status_date ON complaints(status, date)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_amount ON billing(amount)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_due_date ON billing(due_date)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_paid ON billing(paid)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_paid_amount ON billing(paid, amount)',
+        'CREATE INDEX IF NOT EXISTS idx_billing_paid_due_date ON billing(paid, due_date)',
+        'CREATE INDEX IF NOT EXISTS idx_plans_name ON plans(name)',
+        'CREATE INDEX IF NOT EXISTS idx_plans_speed ON plans(speed)',
+        'CREATE INDEX IF NOT EXISTS idx_plans_price ON plans(price)',
+    ],
+    # 7 - persistent activity log, appended to by log_activity
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS activity_log (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            logged_at TEXT NOT NULL,
+            category TEXT NOT NULL,
+            action TEXT NOT NULL,
+            details TEXT NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_activity_log_time ON activity_log(logged_at)',
+        'CREATE INDEX IF NOT EXISTS idx_activity_log_category ON activity_log(category, logged_at)',
+    ],
+    # 8 - indexes behind the dashboard timeline. Each orders its rows by
+    # (time, rowid) so equal timestamps, such as a bulk import or a billing
+    # run, do not need sorting. Bills record when they were created; bills
+    # from before this migration have no created_at and only show up in the
+    # timeline once paid. payment_date is the day the money arrived; paid_at
+    # is when the bill was marked paid and places the payment among the
+    # other events of that day. Bills paid before this migration keep
+    # sorting to the start of their payment date.
+    [
+        'DROP INDEX IF EXISTS idx_customers_registration',
+        'CREATE INDEX IF NOT EXISTS idx_customers_registered ON customers(registration_date)',
+        'ALTER TABLE billing ADD COLUMN created_at TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_billing_created ON billing(created_at)',
+        'ALTER TABLE billing ADD COLUMN paid_at TEXT',
+        "UPDATE billing SET paid_at = payment_date || ' 00:00:00' WHERE paid = 1 AND payment_date IS NOT NULL",
+        'CREATE INDEX IF NOT EXISTS idx_billing_paid_at ON billing(paid_at)',
+    ],
+    # 9 - technicians and their booked visits. A technician's visits never
+    # overlap, so the latest visit starting before a new one ends is the only
+    # one that can clash with it; the triggers check that single row through
+    # the (technician_id, start_at, end_at) index.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS technicians (
+            technician_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS visits (
+            visit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            technician_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            start_at TEXT NOT NULL,
+            end_at TEXT NOT NULL,
+            issue TEXT NOT NULL,
+            created_at TEXT,
+            CHECK (end_at > start_at),
+            FOREIGN KEY (technician_id) REFERENCES technicians(technician_id),
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_visits_technician ON visits(technician_id, start_at, end_at)',
+        'CREATE INDEX IF NOT EXISTS idx_visits_start ON visits(start_at, technician_id, end_at)',
+        'CREATE INDEX IF NOT EXISTS idx_visits_customer ON visits(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_visits_created ON visits(created_at)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_visits_overlap_insert BEFORE INSERT ON visits
+        WHEN (SELECT end_at FROM visits
+              WHERE technician_id = NEW.technician_id AND start_at < NEW.end_at
+              ORDER BY start_at DESC LIMIT 1) > NEW.start_at
+        BEGIN
+            SELECT RAISE(ABORT, 'Technician is already booked at that time');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_visits_overlap_update BEFORE UPDATE OF technician_id, start_at, end_at ON visits
+        WHEN (SELECT end_at FROM visits
+              WHERE technician_id = NEW.technician_id AND start_at < NEW.end_at AND visit_id != NEW.visit_id
+              ORDER BY start_at DESC LIMIT 1) > NEW.start_at
+        BEGIN
+            SELECT RAISE(ABORT, 'Technician is already booked at that time');
+        END
+        ''',
+    ],
+    # 10 - dispatch. Customers and technician bases get optional
+    # coordinates, technicians a daily shift, and visits the complaint they
+    # were booked for.
+    [
+        'ALTER TABLE customers ADD COLUMN latitude REAL',
+        'ALTER TABLE customers ADD COLUMN longitude REAL',
+        'ALTER TABLE technicians ADD COLUMN latitude REAL',
+        'ALTER TABLE technicians ADD COLUMN longitude REAL',
+        "ALTER TABLE technicians ADD COLUMN shift_start TEXT NOT NULL DEFAULT '09:00'",
+        "ALTER TABLE technicians ADD COLUMN shift_end TEXT NOT NULL DEFAULT '17:00'",
+        'ALTER TABLE visits ADD COLUMN complaint_id INTEGER REFERENCES complaints(complaint_id)',
+        'CREATE INDEX IF NOT EXISTS idx_visits_complaint ON visits(complaint_id)',
+    ],
+    # 11 - troubleshooting sessions. troubleshooting_daily is a per day and
+    # issue rollup kept current by triggers, so the dashboard never has to
+    # scan the session history. The rollup counts the flags rather than the
+    # links, which are cleared when the linked customer is removed.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS troubleshooting_sessions (
+            session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            issue TEXT NOT NULL,
+            path TEXT NOT NULL,
+            steps INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            technician_scheduled INTEGER NOT NULL DEFAULT 0,
+            complaint_opened INTEGER NOT NULL DEFAULT 0,
+            customer_id INTEGER REFERENCES customers(customer_id),
+            complaint_id INTEGER REFERENCES complaints(complaint_id),
+            visit_id INTEGER REFERENCES visits(visit_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_started ON troubleshooting_sessions(started_at)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_customer ON troubleshooting_sessions(customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_complaint ON troubleshooting_sessions(complaint_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_visit ON troubleshooting_sessions(visit_id)',
+        '''
+        CREATE TABLE IF NOT EXISTS troubleshooting_daily (
+            day TEXT NOT NULL,
+            issue TEXT NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            escalations INTEGER NOT NULL DEFAULT 0,
+            complaints INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, issue)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_daily_insert AFTER INSERT ON troubleshooting_sessions
+        BEGIN
+            INSERT INTO troubleshooting_daily (day, issue, sessions, completed, escalations, complaints)
+            VALUES (substr(NEW.started_at, 1, 10), NEW.issue, 1, NEW.completed,
+                    NEW.technician_scheduled, NEW.complaint_opened)
+            ON CONFLICT (day, issue) DO UPDATE SET
+                sessions = sessions + 1,
+                completed = completed + excluded.completed,
+                escalations = escalations + excluded.escalations,
+                complaints = complaints + excluded.complaints;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_daily_update
+        AFTER UPDATE OF completed, technician_scheduled, complaint_opened ON troubleshooting_sessions
+        BEGIN
+            UPDATE troubleshooting_daily SET
+                completed = completed + NEW.completed - OLD.completed,
+                escalations = escalations + NEW.technician_scheduled - OLD.technician_scheduled,
+                complaints = complaints + NEW.complaint_opened - OLD.complaint_opened
+            WHERE day = substr(NEW.started_at, 1, 10) AND issue = NEW.issue;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_daily_delete AFTER DELETE ON troubleshooting_sessions
+        BEGIN
+            UPDATE troubleshooting_daily SET
+                sessions = sessions - 1,
+                completed = completed - OLD.completed,
+                escalations = escalations - OLD.technician_scheduled,
+                complaints = complaints - OLD.complaint_opened
+            WHERE day = substr(OLD.started_at, 1, 10) AND issue = OLD.issue;
+        END
+        ''',
+    ],
+    # 12 - receivables. billing_monthly holds what was billed and collected
+    # per month and plan, billing_outstanding the unpaid amount per due date.
+    # Both are kept current by triggers, so the AR reports read a few hundred
+    # rollup rows however many bills there are. A bill counts towards its
+    # billing period, or the month of its due date when it has none; bills
+    # without a plan are kept under plan_id 0.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS billing_monthly (
+            month TEXT NOT NULL,
+            plan_id INTEGER NOT NULL,
+            bills INTEGER NOT NULL DEFAULT 0,
+            billed REAL NOT NULL DEFAULT 0,
+            paid_bills INTEGER NOT NULL DEFAULT 0,
+            collected REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, plan_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS billing_outstanding (
+            due_date TEXT PRIMARY KEY,
+            bills INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO billing_monthly (month, plan_id, bills, billed, paid_bills, collected)
+        SELECT COALESCE(billing_period, substr(due_date, 1, 7)), IFNULL(plan_id, 0),
+               COUNT(*), SUM(amount), SUM(paid), SUM(paid * amount)
+        FROM billing
+        GROUP BY 1, 2
+        ''',
+        '''
+        INSERT OR REPLACE INTO billing_outstanding (due_date, bills, amount)
+        SELECT due_date, COUNT(*), SUM(amount)
+        FROM billing WHERE NOT paid
+        GROUP BY due_date
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO billing_monthly (month, plan_id, bills, billed, paid_bills, collected)
+            VALUES (COALESCE(NEW.billing_period, substr(NEW.due_date, 1, 7)), IFNULL(NEW.plan_id, 0),
+                    1, NEW.amount, NEW.paid, NEW.paid * NEW.amount)
+            ON CONFLICT (month, plan_id) DO UPDATE SET
+                bills = bills + 1,
+                billed = billed + excluded.billed,
+                paid_bills = paid_bills + excluded.paid_bills,
+                collected = collected + excluded.collected;
+            INSERT INTO billing_outstanding (due_date, bills, amount)
+            SELECT NEW.due_date, 1, NEW.amount WHERE NOT NEW.paid
+            ON CONFLICT (due_date) DO UPDATE SET
+                bills = bills + 1,
+                amount = amount + excluded.amount;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_update
+        AFTER UPDATE OF amount, due_date, paid, billing_period, plan_id ON billing
+        BEGIN
+            UPDATE billing_monthly SET
+                bills = bills - 1,
+                billed = billed - OLD.amount,
+                paid_bills = paid_bills - OLD.paid,
+                collected = collected - OLD.paid * OLD.amount
+            WHERE month = COALESCE(OLD.billing_period, substr(OLD.due_date, 1, 7))
+              AND plan_id = IFNULL(OLD.plan_id, 0);
+            INSERT INTO billing_monthly (month, plan_id, bills, billed, paid_bills, collected)
+            VALUES (COALESCE(NEW.billing_period, substr(NEW.due_date, 1, 7)), IFNULL(NEW.plan_id, 0),
+                    1, NEW.amount, NEW.paid, NEW.paid * NEW.amount)
+            ON CONFLICT (month, plan_id) DO UPDATE SET
+                bills = bills + 1,
+                billed = billed + excluded.billed,
+                paid_bills = paid_bills + excluded.paid_bills,
+                collected = collected + excluded.collected;
+            UPDATE billing_outstanding SET
+                bills = bills - 1,
+                amount = amount - OLD.amount
+            WHERE due_date = OLD.due_date AND NOT OLD.paid;
+            INSERT INTO billing_outstanding (due_date, bills, amount)
+            SELECT NEW.due_date, 1, NEW.amount WHERE NOT NEW.paid
+            ON CONFLICT (due_date) DO UPDATE SET
+                bills = bills + 1,
+                amount = amount + excluded.amount;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE billing_monthly SET
+                bills = bills - 1,
+                billed = billed - OLD.amount,
+                paid_bills = paid_bills - OLD.paid,
+                collected = collected - OLD.paid * OLD.amount
+            WHERE month = COALESCE(OLD.billing_period, substr(OLD.due_date, 1, 7))
+              AND plan_id = IFNULL(OLD.plan_id, 0);
+            UPDATE billing_outstanding SET
+                bills = bills - 1,
+                amount = amount - OLD.amount
+            WHERE due_date = OLD.due_date AND NOT OLD.paid;
+        END
+        ''',
+    ],
+    # 13 - dates. Every date column holds ISO text, YYYY-MM-DD or
+    # YYYY-MM-DD HH:MM:SS, so comparisons and index range scans follow the
+    # calendar. Rows written in other formats are rewritten; anything that
+    # cannot be read as a date is left as it was. Due dates, which operators
+    # type in, are checked by the database from now on.
+    [
+        lambda cursor: convert_dates(cursor),
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_due_date_insert BEFORE INSERT ON billing
+        WHEN date(NEW.due_date) IS NOT NEW.due_date
+        BEGIN
+            SELECT RAISE(ABORT, 'Due date must be a YYYY-MM-DD date');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_due_date_update BEFORE UPDATE OF due_date ON billing
+        WHEN date(NEW.due_date) IS NOT NEW.due_date
+        BEGIN
+            SELECT RAISE(ABORT, 'Due date must be a YYYY-MM-DD date');
+        END
+        ''',
+    ],
+    # 14 - dunning. dunning_level is the last stage of DUNNING_STAGES a bill
+    # has reached and late_fees what those stages charged on top of it.
+    # Reminders are queued in outbox for whatever sends them, at most one
+    # per bill and stage. The receivables triggers are recreated so that
+    # billing_outstanding counts the fees as owed while billing_monthly
+    # keeps to the amounts billed.
+    [
+        'ALTER TABLE billing ADD COLUMN late_fees REAL NOT NULL DEFAULT 0',
+        'ALTER TABLE billing ADD COLUMN dunning_level INTEGER NOT NULL DEFAULT 0',
+        'CREATE INDEX IF NOT EXISTS idx_billing_dunning ON billing(paid, dunning_level, due_date)',
+        '''
+        CREATE TABLE IF NOT EXISTS outbox (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            customer_id INTEGER NOT NULL,
+            bill_id INTEGER,
+            level INTEGER,
+            payload TEXT NOT NULL,
+            sent_at TEXT,
+            UNIQUE (bill_id, level),
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
+            FOREIGN KEY (bill_id) REFERENCES billing(bill_id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(message_id) WHERE sent_at IS NULL',
+        'CREATE INDEX IF NOT EXISTS idx_outbox_customer ON outbox(customer_id)',
+        'DROP TRIGGER IF EXISTS trg_billing_ar_insert',
+        'DROP TRIGGER IF EXISTS trg_billing_ar_update',
+        'DROP TRIGGER IF EXISTS trg_billing_ar_delete',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO billing_monthly (month, plan_id, bills, billed, paid_bills, collected)
+            VALUES (COALESCE(NEW.billing_period, substr(NEW.due_date, 1, 7)), IFNULL(NEW.plan_id, 0),
+                    1, NEW.amount, NEW.paid, NEW.paid * NEW.amount)
+            ON CONFLICT (month, plan_id) DO UPDATE SET
+                bills = bills + 1,
+                billed = billed + excluded.billed,
+                paid_bills = paid_bills + excluded.paid_bills,
+                collected = collected + excluded.collected;
+            INSERT INTO billing_outstanding (due_date, bills, amount)
+            SELECT NEW.due_date, 1, NEW.amount + NEW.late_fees WHERE NOT NEW.paid
+            ON CONFLICT (due_date) DO UPDATE SET
+                bills = bills + 1,
+                amount = amount + excluded.amount;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_update
+        AFTER UPDATE OF amount, due_date, paid, billing_period, plan_id ON billing
+        BEGIN
+            UPDATE billing_monthly SET
+                bills = bills - 1,
+                billed = billed - OLD.amount,
+                paid_bills = paid_bills - OLD.paid,
+                collected = collected - OLD.paid * OLD.amount
+            WHERE month = COALESCE(OLD.billing_period, substr(OLD.due_date, 1, 7))
+              AND plan_id = IFNULL(OLD.plan_id, 0);
+            INSERT INTO billing_monthly (month, plan_id, bills, billed, paid_bills, collected)
+            VALUES (COALESCE(NEW.billing_period, substr(NEW.due_date, 1, 7)), IFNULL(NEW.plan_id, 0),
+                    1, NEW.amount, NEW.paid, NEW.paid * NEW.amount)
+            ON CONFLICT (month, plan_id) DO UPDATE SET
+                bills = bills + 1,
+                billed = billed + excluded.billed,
+                paid_bills = paid_bills + excluded.paid_bills,
+                collected = collected + excluded.collected;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_outstanding_update
+        AFTER UPDATE OF amount, late_fees, due_date, paid ON billing
+        BEGIN
+            UPDATE billing_outstanding SET
+                bills = bills - 1,
+                amount = amount - (OLD.amount + OLD.late_fees)
+            WHERE due_date = OLD.due_date AND NOT OLD.paid;
+            INSERT INTO billing_outstanding (due_date, bills, amount)
+            SELECT NEW.due_date, 1, NEW.amount + NEW.late_fees WHERE NOT NEW.paid
+            ON CONFLICT (due_date) DO UPDATE SET
+                bills = bills + 1,
+                amount = amount + excluded.amount;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_billing_ar_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE billing_monthly SET
+                bills = bills - 1,
+                billed = billed - OLD.amount,
+                paid_bills = paid_bills - OLD.paid,
+                collected = collected - OLD.paid * OLD.amount
+            WHERE month = COALESCE(OLD.billing_period, substr(OLD.due_date, 1, 7))
+              AND plan_id = IFNULL(OLD.plan_id, 0);
+            UPDATE billing_outstanding SET
+                bills = bills - 1,
+                amount = amount - (OLD.amount + OLD.late_fees)
+            WHERE due_date = OLD.due_date AND NOT OLD.paid;
+        END
+        ''',
+    ],
+    # 15 - bank reconciliation. The bank's reference of the payment that
+    # settled a bill, so a statement reconciled twice is not applied twice.
+    [
+        'ALTER TABLE billing ADD COLUMN payment_reference TEXT',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_billing_payment_reference ON billing(customer_id, payment_reference)
+        WHERE payment_reference IS NOT NULL
+        ''',
+    ],
+    # 16 - usage metering. Bytes per hour and customer, keyed by hour first
+    # so new hours append and old ones are pruned by range, and per customer
+    # and day, which the data limit checks sum over a month. usage_alerts
+    # holds the customers past their plan's data limit in a month.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS usage_hourly (
+            hour TEXT NOT NULL,
+            customer_id INTEGER NOT NULL,
+            bytes_in INTEGER NOT NULL DEFAULT 0,
+            bytes_out INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, customer_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS usage_daily (
+            customer_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            bytes_in INTEGER NOT NULL DEFAULT 0,
+            bytes_out INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (customer_id, day)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS usage_alerts (
+            period TEXT NOT NULL,
+            customer_id INTEGER NOT NULL,
+            used INTEGER NOT NULL,
+            data_limit INTEGER NOT NULL,
+            flagged_at TEXT NOT NULL,
+            PRIMARY KEY (period, customer_id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_usage_alerts_customer ON usage_alerts(customer_id)',
+    ],
+    # 17 - data limits. Plans only accept an amount such as 500 GB, or
+    # Unlimited, from now on; limits saved earlier as free text are rewritten
+    # to that form.
+    [
+        lambda cursor: normalize_data_limits(cursor),
+    ],
+    # 18 - customer sort orders. The customer grid and picker sort by email,
+    # plan and registration date; customers without a plan or registration
+    # date sort first through these expressions.
+    [
+        'CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_plan_sort ON customers(COALESCE(plan_id, 0))',
+        "CREATE INDEX IF NOT EXISTS idx_customers_registered_sort ON customers(COALESCE(registration_date, ''))",
+    ],
+]
+
+def migrate(conn, target=None):
+    if target is None:
+        target = len(MIGRATIONS)
+    cursor = conn.cursor()
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    
+    # Each migration runs in its own transaction together with the version bump
+    while version < target:
+        try:
+            cursor.execute('BEGIN')
+            for statement in MIGRATIONS[version]:
+                # Steps SQL cannot express are functions of the cursor
+                if callable(statement):
+                    statement(cursor)
+                else:
+                    cursor.execute(statement)
+            version += 1
+            cursor.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+class DBConfig:
+    # Connection settings for isp_database.db. Several desk operators can run
+    # their own instance against a shared database file: WAL lets readers
+    # carry on while one process writes, and writers that still collide wait
+    # on the busy timeout and are then retried with exponential backoff.
+    # Every setting can be overridden with an ISP_DB_* environment variable.
+    def __init__(self, database='isp_database.db', journal_mode='WAL', synchronous='NORMAL',
+                 busy_timeout=5.0, cache_size_kb=64 * 1024, mmap_size=256 * 1024 * 1024,
+                 retries=5, backoff=0.05):
+        self.database = database
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.retries = retries
+        self.backoff = backoff
+    
+    @classmethod
+    def from_env(cls, **overrides):
+        config = cls(**overrides)
+        settings = {
+            'ISP_DB_PATH': ('database', str),
+            'ISP_DB_JOURNAL_MODE': ('journal_mode', str),
+            'ISP_DB_SYNCHRONOUS': ('synchronous', str),
+            'ISP_DB_BUSY_TIMEOUT': ('busy_timeout', float),
+            'ISP_DB_CACHE_SIZE_KB': ('cache_size_kb', int),
+            'ISP_DB_MMAP_SIZE': ('mmap_size', int),
+            'ISP_DB_RETRIES': ('retries', int),
+            'ISP_DB_BACKOFF': ('backoff', float),
+        }
+        for variable, (attribute, convert) in settings.items():
+            if variable in os.environ:
+                setattr(config, attribute, convert(os.environ[variable]))
+        return config
+    
+    def connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.busy_timeout)
+        conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}')
+        # A negative cache_size is a size in KiB rather than in pages
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        return conn
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def call_with_retry(config, conn, fn, *args):
+    # Re-run fn from the start when another process holds the write lock for
+    # longer than the busy timeout. Whatever fn did so far is rolled back first.
+    attempt = 0
+    while True:
+        try:
+            return fn(conn, *args)
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy_error(e) or attempt >= config.retries:
+                raise
+            time.sleep(config.backoff * (2 ** attempt) * (1 + random.random()))
+            attempt += 1
+
+class ChangeSet:
+    # Row ids touched by a mutation, grouped by table. Applying one patches
+    # the matching grid rows in place instead of reloading every grid.
+    def __init__(self):
+        self.inserted = {}
+        self.updated = {}
+        self.deleted = {}
+    
+    def insert(self, table, *row_ids):
+        self.inserted.setdefault(table, []).extend(row_ids)
+        return self
+    
+    def update(self, table, *row_ids):
+        self.updated.setdefault(table, []).extend(row_ids)
+        return self
+    
+    def delete(self, table, *row_ids):
+        self.deleted.setdefault(table, []).extend(row_ids)
+        return self
+    
+    def touches(self, table):
+        return bool(self.inserted.get(table) or self.updated.get(table) or self.deleted.get(table))
+
+def fetch_all(conn, sql, params=()):
+    return conn.execute(sql, params).fetchall()
+
+def fetch_one(conn, sql, params=()):
+    return conn.execute(sql, params).fetchone()
+
+# Search: hits returned per search, matches ranked per search, and the
+# shortest text worth searching for. Ranking every match of a short prefix
+# over millions of rows takes too long to keep up with typing, so only the
+# first SEARCH_CANDIDATES matches are ranked.
+SEARCH_LIMIT = 200
+SEARCH_CANDIDATES = 5000
+SEARCH_MIN_LENGTH = 2
+
+def fts_query(text):
+    # Typed text as an FTS5 MATCH expression. Every word has to match, as a
+    # prefix so results appear while the word is still being typed. Returns
+    # None when there is nothing worth searching for.
+    words = text.split()
+    if len(''.join(words)) < SEARCH_MIN_LENGTH:
+        return None
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+def fetch_dashboard_counts(conn):
+    # The stats and plan_stats tables are maintained by triggers, so this
+    # is a single-row read whatever the size of the underlying tables
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT s.customers, s.active_customers, s.plans, s.open_complaints, s.resolved_complaints,
+           p.name, ps.subscribers
+    FROM stats s
+    LEFT JOIN (SELECT plan_id, subscribers FROM plan_stats
+               ORDER BY subscribers DESC LIMIT 1) ps ON 1
+    LEFT JOIN plans p ON p.plan_id = ps.plan_id
+    WHERE s.id = 1
+    ''')
+    return cursor.fetchone()
+
+# Dashboard timeline. Every source is read newest first from its own index
+# and the branches are merged by (time, rank, id), so a page costs a few
+# index probes whatever the table sizes. Paging continues from the last row
+# shown; TIMELINE_START sorts after every real row.
+TIMELINE_PAGE = 20
+TIMELINE_START = ('9999-12-31 23:59:59', 0, 0)
+
+TIMELINE_SQL = '''
+SELECT at, rank, id, type, details FROM (
+    SELECT * FROM (
+        SELECT c.registration_date AS at, 4 AS rank, c.customer_id AS id,
+               'New Customer' AS type, c.name AS details
+        FROM customers c
+        WHERE (c.registration_date, 4, c.customer_id) < (?1, ?2, ?3)
+        ORDER BY c.registration_date DESC, c.customer_id DESC LIMIT ?4)
+    UNION ALL
+    SELECT * FROM (
+        SELECT co.date, 3, co.complaint_id,
+               'New Complaint', c.name || ' - ' || SUBSTR(co.description, 1, 30) || '...'
+        FROM complaints co JOIN customers c ON co.customer_id = c.customer_id
+        WHERE (co.date, 3, co.complaint_id) < (?1, ?2, ?3)
+        ORDER BY co.date DESC, co.complaint_id DESC LIMIT ?4)
+    UNION ALL
+    SELECT * FROM (
+        SELECT b.created_at, 2, b.bill_id,
+               'Bill Generated', c.name || ' - ' || printf('%.2f', b.amount)
+        FROM billing b JOIN customers c ON b.customer_id = c.customer_id
+        WHERE (b.created_at, 2, b.bill_id) < (?1, ?2, ?3)
+        ORDER BY b.created_at DESC, b.bill_id DESC LIMIT ?4)
+    UNION ALL
+    SELECT * FROM (
+        SELECT b.paid_at, 1, b.bill_id,
+               'Bill Paid', c.name || ' - ' || printf('%.2f', b.amount)
+        FROM billing b JOIN customers c ON b.customer_id = c.customer_id
+        WHERE (b.paid_at, 1, b.bill_id) < (?1, ?2, ?3)
+        ORDER BY b.paid_at DESC, b.bill_id DESC LIMIT ?4)
+    UNION ALL
+    SELECT * FROM (
+        SELECT v.created_at, 5, v.visit_id,
+               'Visit Scheduled', c.name || ' - ' || t.name || ' at ' || v.start_at
+        FROM visits v JOIN customers c ON v.customer_id = c.customer_id
+        JOIN technicians t ON v.technician_id = t.technician_id
+        WHERE (v.created_at, 5, v.visit_id) < (?1, ?2, ?3)
+        ORDER BY v.created_at DESC, v.visit_id DESC LIMIT ?4)
+)
+ORDER BY at DESC, rank DESC, id DESC LIMIT ?4
+'''
+
+def fetch_timeline(conn, before=TIMELINE_START, limit=TIMELINE_PAGE):
+    # Rows are (time, rank, id, type, details); pass the last one's first
+    # three values as before to get the next older page
+    return conn.execute(TIMELINE_SQL, (*before, limit)).fetchall()
+
+# Activity log. Reads return at most ACTIVITY_VIEW_ROWS entries, the most
+# the Activity Log tab keeps on screen.
+ACTIVITY_VIEW_ROWS = 500
+ACTIVITY_CATEGORIES = ['customer', 'plan', 'complaint', 'billing', 'other']
+
+def activity_category(activity):
+    activity = activity.lower()
+    if 'customer' in activity:
+        return 'customer'
+    elif 'plan' in activity:
+        return 'plan'
+    elif 'complaint' in activity or 'technician' in activity:
+        return 'complaint'
+    elif 'bill' in activity:
+        return 'billing'
+    return 'other'
+
+def insert_activity(conn, entries):
+    # entries are (logged_at, category, action, details) tuples
+    conn.executemany('''
+    INSERT INTO activity_log (logged_at, category, action, details)
+    VALUES (?, ?, ?, ?)
+    ''', entries)
+    conn.commit()
+
+def fetch_activity(conn, category=None, start=None, end=None, limit=ACTIVITY_VIEW_ROWS):
+    # Newest entries first, optionally narrowed to a category and to a
+    # YYYY-MM-DD date range
+    conditions = []
+    params = []
+    if category:
+        conditions.append('category = ?')
+        params.append(category)
+    if start:
+        conditions.append('logged_at >= ?')
+        params.append(start)
+    if end:
+        conditions.append("logged_at < date(?, '+1 day')")
+        params.append(end)
+    
+    sql = 'SELECT logged_at, category, action, details FROM activity_log'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY logged_at DESC, log_id DESC LIMIT ?'
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+# Dates are accepted in any of DATE_FORMATS (day first when the day is not
+# last) and stored as ISO text
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y']
+TIMESTAMP_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M'] + DATE_FORMATS
+
+# (table, key, column, formats, stored format) of every date column
+DATE_COLUMNS = [
+    ('billing', 'bill_id', 'due_date', DATE_FORMATS, '%Y-%m-%d'),
+    ('billing', 'bill_id', 'payment_date', DATE_FORMATS, '%Y-%m-%d'),
+    ('billing', 'bill_id', 'created_at', TIMESTAMP_FORMATS, '%Y-%m-%d %H:%M:%S'),
+    ('billing', 'bill_id', 'paid_at', TIMESTAMP_FORMATS, '%Y-%m-%d %H:%M:%S'),
+    ('customers', 'customer_id', 'registration_date', TIMESTAMP_FORMATS, '%Y-%m-%d %H:%M:%S'),
+    ('complaints', 'complaint_id', 'date', TIMESTAMP_FORMATS, '%Y-%m-%d %H:%M:%S'),
+]
+
+def parse_date(value, formats):
+    value = str(value).strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+def validate_date(value, field="Date"):
+    parsed = parse_date(value, DATE_FORMATS) if value not in (None, '') else None
+    if parsed is None:
+        raise ValueError(f"{field} must be a date in YYYY-MM-DD format")
+    return parsed.strftime('%Y-%m-%d')
+
+def validate_timestamp(value, field="Date"):
+    parsed = parse_date(value, TIMESTAMP_FORMATS) if value not in (None, '') else None
+    if parsed is None:
+        raise ValueError(f"{field} must be a date in YYYY-MM-DD HH:MM:SS format")
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def convert_dates(cursor):
+    # Rewrite the date columns in ISO form. Only rows SQLite does not already
+    # read back unchanged are fetched, so an up-to-date database costs one
+    # scan per column. Returns the number of values that could not be read.
+    unreadable = 0
+    for table, key, column, formats, stored in DATE_COLUMNS:
+        iso = 'date' if stored == '%Y-%m-%d' else 'datetime'
+        rows = cursor.execute(f'''
+        SELECT {key}, {column} FROM {table}
+        WHERE {column} IS NOT NULL AND {iso}({column}) IS NOT {column}
+        ''').fetchall()
+        updates = []
+        for row_id, value in rows:
+            parsed = parse_date(value, formats)
+            if parsed is None:
+                unreadable += 1
+            else:
+                updates.append((parsed.strftime(stored), row_id))
+        cursor.executemany(f'UPDATE {table} SET {column}=? WHERE {key}=?', updates)
+    return unreadable
+
+# Field rules shared by the forms and the bulk importer. Each returns the
+# values ready for insert_customer / insert_plan or raises ValueError with
+# the message the form shows.
+def text_field(value, field):
+    # Forms pass strings; imported JSON may also carry numbers, which are
+    # stored as text. Lists and objects are rejected.
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        raise ValueError(f"{field} must be text")
+    return str(value)
+
+def validate_customer(name, address, phone, email, plan_id=None):
+    name, address = text_field(name, "Name"), text_field(address, "Address")
+    phone, email = text_field(phone, "Phone"), text_field(email, "Email")
+    if not name or not address or not phone or not email:
+        raise ValueError("Please fill all required fields")
+    if plan_id in (None, ''):
+        plan_id = None
+    else:
+        try:
+            plan_id = int(plan_id)
+        except (TypeError, ValueError):
+            raise ValueError("Plan id must be a whole number")
+    return name, address, phone, email, plan_id
+
+def validate_location(latitude, longitude):
+    # Both blank means no location
+    if latitude in (None, '') and longitude in (None, ''):
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("Latitude and longitude must both be numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("Latitude or longitude out of range")
+    return latitude, longitude
+
+def validate_technician(name, shift_start, shift_end, latitude='', longitude=''):
+    if not name or not shift_start or not shift_end:
+        raise ValueError("Please fill all required fields")
+    try:
+        shift_start = datetime.strptime(shift_start, '%H:%M').strftime('%H:%M')
+        shift_end = datetime.strptime(shift_end, '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise ValueError("Shift times must be in HH:MM format")
+    if shift_end <= shift_start:
+        raise ValueError("Shift must end after it starts")
+    return (name, shift_start, shift_end) + validate_location(latitude, longitude)
+
+def validate_plan(name, speed, price, data_limit='', description=''):
+    name, speed = text_field(name, "Name"), text_field(speed, "Speed")
+    data_limit, description = text_field(data_limit, "Data limit"), text_field(description, "Description")
+    if not name or not speed or price in (None, ''):
+        raise ValueError("Please fill all required fields")
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        raise ValueError("Price must be a valid number")
+    if not math.isfinite(price):
+        raise ValueError("Price must be a valid number")
+    if price < 0:
+        raise ValueError("Price cannot be negative")
+    if data_limit and parse_data_limit(data_limit) is None and not UNLIMITED.fullmatch(data_limit):
+        raise ValueError("Data limit must be an amount such as 500 GB, or Unlimited")
+    return name, speed, price, data_limit, description
+
+# Plan data limits are free text such as "100 GB", "1.5TB", "500 MB/month"
+# or "Unlimited". Units are decimal, with KiB/MiB/GiB/TiB for binary ones.
+DATA_LIMIT = re.compile(r'\s*(\d+(?:\.\d+)?)\s*([KMGT])(i?)B?\s*(?:(?:/|per)\s*month)?\s*', re.IGNORECASE)
+UNLIMITED = re.compile(r'\s*(unlimited|none|-)?\s*', re.IGNORECASE)
+
+def parse_data_limit(text):
+    # The limit in bytes, or None when there is none or it cannot be read
+    match = DATA_LIMIT.fullmatch(text or '')
+    if match is None:
+        return None
+    amount, unit, binary = match.groups()
+    power = 'KMGT'.index(unit.upper()) + 1
+    return int(float(amount) * (1024 if binary else 1000) ** power)
+
+DATA_LIMIT_PREFIX = re.compile(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]i?B)\b', re.IGNORECASE)
+
+def normalize_data_limits(cursor):
+    # Plans saved before data limits were validated can hold free text such
+    # as "100GB FUP" or "10". A leading amount with a unit becomes the limit
+    # and anything else leaves the plan without one; either way the old text
+    # is kept at the end of the description.
+    updates = []
+    for plan_id, data_limit, description in cursor.execute(
+            'SELECT plan_id, data_limit, description FROM plans').fetchall():
+        data_limit = str(data_limit or '').strip()
+        if parse_data_limit(data_limit) is not None or UNLIMITED.fullmatch(data_limit):
+            continue
+        match = DATA_LIMIT_PREFIX.match(data_limit)
+        note = f"Data limit: {data_limit}"
+        updates.append((f"{match.group(1)} {match.group(2)}" if match else '',
+                        f"{description}; {note}" if description else note, plan_id))
+    cursor.executemany('UPDATE plans SET data_limit=?, description=? WHERE plan_id=?', updates)
+
+# Mutations. Each one runs on the database thread, commits its change and
+# returns a ChangeSet describing the rows it touched.
+def insert_customer(conn, name, address, phone, email, plan_id):
+    cursor = conn.cursor()
+    registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+    INSERT INTO customers (name, address, phone, email, plan_id, registration_date)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (name, address, phone, email, plan_id, registration_date))
+    conn.commit()
+    
+    return ChangeSet().insert('customers', cursor.lastrowid)
+
+def modify_customer(conn, customer_id, name, address, phone, email, plan_id):
+    cursor = conn.cursor()
+    cursor.execute('''
+    UPDATE customers 
+    SET name=?, address=?, phone=?, email=?, plan_id=?
+    WHERE customer_id=?
+    ''', (name, address, phone, email, plan_id, customer_id))
+    conn.commit()
+    
+    return ChangeSet().update('customers', customer_id)
+
+def remove_customer(conn, customer_id):
+    cursor = conn.cursor()
+    cursor.execute('SELECT complaint_id FROM complaints WHERE customer_id=?', (customer_id,))
+    complaint_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT bill_id FROM billing WHERE customer_id=?', (customer_id,))
+    bill_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute('SELECT visit_id FROM visits WHERE customer_id=?', (customer_id,))
+    visit_ids = [row[0] for row in cursor.fetchall()]
+    
+    # First delete related records
+    # Troubleshooting sessions stay in the statistics, just unlinked
+    cursor.execute('''
+    UPDATE troubleshooting_sessions SET customer_id = NULL, complaint_id = NULL, visit_id = NULL
+    WHERE customer_id=?
+    ''', (customer_id,))
+    cursor.execute('DELETE FROM visits WHERE customer_id=?', (customer_id,))
+    cursor.execute('DELETE FROM complaints WHERE customer_id=?', (customer_id,))
+    cursor.execute('DELETE FROM outbox WHERE customer_id=?', (customer_id,))
+    # Hourly rows are keyed by hour first; the customer's days say which to delete
+    days = [row[0] for row in cursor.execute('SELECT day FROM usage_daily WHERE customer_id=?', (customer_id,))]
+    cursor.executemany('DELETE FROM usage_hourly WHERE hour=? AND customer_id=?',
+                       ((f'{day} {hour:02d}', customer_id) for day in days for hour in range(24)))
+    cursor.execute('DELETE FROM usage_daily WHERE customer_id=?', (customer_id,))
+    cursor.execute('DELETE FROM usage_alerts WHERE customer_id=?', (customer_id,))
+    cursor.execute('DELETE FROM billing WHERE customer_id=?', (customer_id,))
+    
+    # Then delete customer
+    cursor.execute('DELETE FROM customers WHERE customer_id=?', (customer_id,))
+    conn.commit()
+    
+    changes = ChangeSet().delete('customers', customer_id)
+    changes.delete('complaints', *complaint_ids)
+    changes.delete('billing', *bill_ids)
+    changes.delete('visits', *visit_ids)
+    return changes
+
+def insert_plan(conn, name, speed, price, data_limit, description):
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO plans (name, speed, price, data_limit, description)
+    VALUES (?, ?, ?, ?, ?)
+    ''', (name, speed, price, data_limit, description))
+    conn.commit()
+    
+    return ChangeSet().insert('plans', cursor.lastrowid)
+
+def modify_plan(conn, plan_id, name, speed, price, data_limit, description):
+    cursor = conn.cursor()
+    cursor.execute('''
+    UPDATE plans 
+    SET name=?, speed=?, price=?, data_limit=?, description=?
+    WHERE plan_id=?
+    ''', (name, speed, price, data_limit, description, plan_id))
+    conn.commit()
+    
+    return ChangeSet().update('plans', plan_id)
+
+def remove_plan(conn, plan_id):
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM plans WHERE plan_id=?', (plan_id,))
+    conn.commit()
+    
+    return ChangeSet().delete('plans', plan_id)
+
+# Troubleshooting sessions. A session is recorded when a guide is started and
+# saved again as the operator answers its questions; path is the JSON list
+# of the guide nodes shown.
+TROUBLESHOOTING_SUMMARY_DAYS = 30
+
+def start_troubleshooting_session(conn, issue, path, steps, completed, customer_id=None):
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO troubleshooting_sessions (started_at, issue, path, steps, completed, customer_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), issue, json.dumps(path), steps, int(completed),
+          customer_id))
+    conn.commit()
+    return cursor.lastrowid
+
+def save_troubleshooting_session(conn, session_id, path, steps, completed):
+    conn.execute('''
+    UPDATE troubleshooting_sessions SET path=?, steps=?, completed=?
+    WHERE session_id=?
+    ''', (json.dumps(path), steps, int(completed), session_id))
+    conn.commit()
+
+def link_troubleshooting_session(conn, session_id, customer_id, complaint_id=None, visit_id=None):
+    # Runs inside the caller's transaction. A session belongs to one
+    # customer, so a complaint or visit for somebody else is not linked.
+    conn.execute('''
+    UPDATE troubleshooting_sessions
+    SET customer_id = ?,
+        complaint_id = IFNULL(?, complaint_id),
+        complaint_opened = complaint_opened OR ? IS NOT NULL,
+        visit_id = IFNULL(?, visit_id),
+        technician_scheduled = technician_scheduled OR ? IS NOT NULL
+    WHERE session_id = ? AND (customer_id IS NULL OR customer_id = ?)
+    ''', (customer_id, complaint_id, complaint_id, visit_id, visit_id, session_id, customer_id))
+
+def fetch_troubleshooting_summary(conn, days=TROUBLESHOOTING_SUMMARY_DAYS):
+    # Sessions, escalations to a technician and complaints opened per issue
+    # over the last days, busiest issue first, read from the daily rollup
+    return conn.execute('''
+    SELECT issue, SUM(sessions), SUM(escalations), SUM(complaints)
+    FROM troubleshooting_daily
+    WHERE day >= date('now', 'localtime', ?)
+    GROUP BY issue
+    ORDER BY SUM(sessions) DESC, issue
+    ''', (f'-{days - 1} days',)).fetchall()
+
+def insert_complaint(conn, customer_id, description, status, session_id=None):
+    cursor = conn.cursor()
+    complaint_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+    INSERT INTO complaints (customer_id, description, date, status)
+    VALUES (?, ?, ?, ?)
+    ''', (customer_id, description, complaint_date, status))
+    if session_id is not None:
+        link_troubleshooting_session(conn, session_id, customer_id, complaint_id=cursor.lastrowid)
+    conn.commit()
+    
+    return ChangeSet().insert('complaints', cursor.lastrowid)
+
+def modify_complaint(conn, complaint_id, customer_id, description, status, resolution):
+    cursor = conn.cursor()
+    cursor.execute('''
+    UPDATE complaints 
+    SET customer_id=?, description=?, status=?, resolution=?
+    WHERE complaint_id=?
+    ''', (customer_id, description, status, resolution, complaint_id))
+    conn.commit()
+    
+    return ChangeSet().update('complaints', complaint_id)
+
+def close_complaint(conn, complaint_id, resolution):
+    cursor = conn.cursor()
+    cursor.execute('''
+    UPDATE complaints 
+    SET status='Resolved', resolution=?
+    WHERE complaint_id=?
+    ''', (resolution, complaint_id))
+    conn.commit()
+    
+    return ChangeSet().update('complaints', complaint_id)
+
+def insert_bill(conn, customer_id, amount, due_date):
+    cursor = conn.cursor()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+    INSERT INTO billing (customer_id, amount, due_date, created_at)
+    VALUES (?, ?, ?, ?)
+    ''', (customer_id, amount, due_date, created_at))
+    conn.commit()
+    
+    return ChangeSet().insert('billing', cursor.lastrowid)
+
+# Bulk import. Rows are validated with the form rules, inserted in batches of
+# IMPORT_BATCH per transaction and never held in memory all at once.
+IMPORT_BATCH = 5000
+
+IMPORTS = {
+    'customers': (
+        ('name', 'address', 'phone', 'email', 'plan_id'),
+        validate_customer,
+        '''
+        INSERT INTO customers (name, address, phone, email, plan_id, registration_date, latitude, longitude)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+    ),
+    'plans': (
+        ('name', 'speed', 'price', 'data_limit', 'description'),
+        validate_plan,
+        '''
+        INSERT INTO plans (name, speed, price, data_limit, description)
+        VALUES (?, ?, ?, ?, ?)
+        ''',
+    ),
+}
+
+def read_records(path):
+    # Yield (line number, record, error) from a CSV file with a header row or
+    # a JSONL file with one object per line. Lines that cannot be parsed come
+    # back as the raw text with the reason in error.
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.json')):
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, line.rstrip('\r\n'), f"Invalid JSON: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, line.rstrip('\r\n'), "Expected a JSON object"
+                    continue
+                yield line_number, record, None
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record, None
+
+def import_records(conn, table, path, rejects_path=None, progress=None):
+    # Stream path into table. Rejected rows go to rejects_path (default
+    # <path>.rejects.csv) with their line number and reason; the file is only
+    # created when something is rejected. progress(rows read) is called after
+    # every batch. Returns (imported, rejected, rejects_path or None).
+    fields, validate, insert_sql = IMPORTS[table]
+    if rejects_path is None:
+        rejects_path = path + '.rejects.csv'
+    known_plans = {row[0] for row in conn.execute('SELECT plan_id FROM plans')}
+    registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    imported = rejected = read = 0
+    batch = []
+    rejects_file = rejects = None
+    
+    def flush():
+        # Batches are committed as they go, so a lock timeout here must not
+        # be retried from the first row by the executor
+        try:
+            conn.executemany(insert_sql, batch)
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            raise RuntimeError(f"Import stopped after {imported} rows: {e}")
+        count = len(batch)
+        batch.clear()
+        return count
+    
+    try:
+        for line_number, record, error in read_records(path):
+            read += 1
+            try:
+                if error:
+                    raise ValueError(error)
+                values = validate(*(record.get(field) for field in fields))
+                if table == 'customers':
+                    if values[4] is not None and values[4] not in known_plans:
+                        raise ValueError(f"Unknown plan id {values[4]}")
+                    registered = record.get('registration_date')
+                    values += (validate_timestamp(registered, "Registration date") if registered
+                               else registration_date,)
+                    values += validate_location(record.get('latitude'), record.get('longitude'))
+            except (TypeError, ValueError) as e:
+                if rejects is None:
+                    rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                    rejects = csv.writer(rejects_file)
+                    rejects.writerow(['line', 'error', 'record'])
+                rejects.writerow([line_number, str(e), record if error else json.dumps(record)])
+                rejected += 1
+                continue
+            
+            batch.append(values)
+            if len(batch) >= IMPORT_BATCH:
+                imported += flush()
+                if progress:
+                    progress(read)
+        if batch:
+            imported += flush()
+        if progress:
+            progress(read)
+    finally:
+        if rejects_file:
+            rejects_file.close()
+    
+    return imported, rejected, rejects_path if rejected else None
+
+# Export. Each entry is the column list with its type, used for the Parquet
+# schema, and the query walked with fetchmany so memory stays constant.
+EXPORT_CHUNK = 5000
+
+EXPORTS = {
+    'customers': (
+        (('customer_id', 'int'), ('name', 'text'), ('address', 'text'), ('phone', 'text'),
+         ('email', 'text'), ('plan', 'text'), ('registration_date', 'text')),
+        '''
+        SELECT c.customer_id, c.name, c.address, c.phone, c.email, p.name, c.registration_date
+        FROM customers c LEFT JOIN plans p ON c.plan_id = p.plan_id
+        ORDER BY c.customer_id
+        ''',
+    ),
+    'complaints': (
+        (('complaint_id', 'int'), ('customer_id', 'int'), ('customer', 'text'), ('date', 'text'),
+         ('status', 'text'), ('description', 'text'), ('resolution', 'text')),
+        '''
+        SELECT co.complaint_id, co.customer_id, c.name, co.date, co.status, co.description, co.resolution
+        FROM complaints co JOIN customers c ON co.customer_id = c.customer_id
+        ORDER BY co.complaint_id
+        ''',
+    ),
+    'billing': (
+        (('bill_id', 'int'), ('customer_id', 'int'), ('customer', 'text'), ('amount', 'real'),
+         ('late_fees', 'real'), ('due_date', 'text'), ('paid', 'int'), ('payment_date', 'text'),
+         ('billing_period', 'text'), ('plan_id', 'int')),
+        '''
+        SELECT b.bill_id, b.customer_id, c.name, b.amount, b.late_fees, b.due_date, b.paid, b.payment_date,
+               b.billing_period, b.plan_id
+        FROM billing b JOIN customers c ON b.customer_id = c.customer_id
+        ORDER BY b.bill_id
+        ''',
+    ),
+}
+
+def export_records(conn, table, path, progress=None):
+    # Write table to path as CSV, or as Parquet when path ends in .parquet.
+    # progress(rows written) is called after every chunk. Returns the number
+    # of rows written.
+    columns, sql = EXPORTS[table]
+    cursor = conn.execute(sql)
+    written = 0
+    
+    if path.lower().endswith('.parquet'):
+        # Parquet support is optional
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+        
+        types = {'int': pa.int64(), 'real': pa.float64(), 'text': pa.string()}
+        schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK)
+                if not rows:
+                    break
+                # One row group per chunk
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array([row[i] for row in rows], type=schema.field(i).type)
+                     for i in range(len(columns))],
+                    schema=schema))
+                written += len(rows)
+                if progress:
+                    progress(written)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, kind in columns])
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+                if progress:
+                    progress(written)
+    
+    return written
+
+# Customer ids covered by one INSERT ... SELECT of a billing run
+BILLING_CHUNK = 50000
+
+def generate_billing_cycle(conn, period, due_date, progress=None):
+    # Bill every customer on a plan for period (YYYY-MM) at the plan price.
+    # The whole run is one transaction, inserted in customer_id ranges so
+    # progress(fraction) can be reported between chunks. Customers already
+    # billed for the period are skipped by the unique index, which makes a
+    # repeated run a no-op. A run that fails part way, or whose progress
+    # callback raises, is rolled back. Returns the number of bills created.
+    cursor = conn.cursor()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    last_id = cursor.execute('SELECT MAX(customer_id) FROM customers').fetchone()[0] or 0
+    
+    created = 0
+    try:
+        for start in range(0, last_id, BILLING_CHUNK):
+            cursor.execute('''
+            INSERT OR IGNORE INTO billing (customer_id, amount, due_date, plan_id, billing_period, created_at)
+            SELECT c.customer_id, p.price, ?, p.plan_id, ?, ?
+            FROM customers c JOIN plans p ON c.plan_id = p.plan_id
+            WHERE c.customer_id > ? AND c.customer_id <= ?
+            ''', (due_date, period, created_at, start, start + BILLING_CHUNK))
+            created += cursor.rowcount
+            if progress:
+                progress(min(start + BILLING_CHUNK, last_id) / last_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return created
+
+# Aging buckets of unpaid bills by days past the due date. Bills whose due
+# date is not a YYYY-MM-DD date are reported separately.
+AGING_BUCKETS = ['Not yet due', '0-30 days', '31-60 days', '61-90 days', '90+ days', 'Unreadable due date']
+
+def fetch_ar_aging(conn, as_of=None):
+    # (bucket, bills, amount) for every bucket holding unpaid bills on the
+    # as_of date (default today), read from billing_outstanding
+    as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+    rows = conn.execute('''
+    SELECT CASE WHEN days IS NULL THEN 5
+                WHEN days <= 0 THEN 0
+                WHEN days <= 30 THEN 1
+                WHEN days <= 60 THEN 2
+                WHEN days <= 90 THEN 3
+                ELSE 4 END AS bucket,
+           SUM(bills), SUM(amount)
+    FROM (SELECT julianday(?) - julianday(due_date) AS days, bills, amount
+          FROM billing_outstanding WHERE bills > 0)
+    GROUP BY bucket ORDER BY bucket
+    ''', (as_of,))
+    return [(AGING_BUCKETS[bucket], bills, round(amount, 2)) for bucket, bills, amount in rows]
+
+def fetch_revenue(conn, period):
+    # (plan, bills, billed, paid bills, collected) per plan for one month,
+    # largest first, read from billing_monthly. Bills without a plan and
+    # bills of removed plans are listed under their own rows.
+    rows = conn.execute('''
+    SELECT m.plan_id, p.name, m.bills, m.billed, m.paid_bills, m.collected
+    FROM billing_monthly m LEFT JOIN plans p ON p.plan_id = m.plan_id
+    WHERE m.month = ? AND m.bills > 0
+    ORDER BY m.billed DESC
+    ''', (period,))
+    return [(name or ("No plan" if plan_id == 0 else f"Plan #{plan_id}"),
+             bills, round(billed, 2), paid_bills, round(collected, 2))
+            for plan_id, name, bills, billed, paid_bills, collected in rows]
+
+def fetch_collections(conn, first, last):
+    # (month, billed, collected) for the months first..last (YYYY-MM)
+    rows = conn.execute('''
+    SELECT month, SUM(billed), SUM(collected)
+    FROM billing_monthly
+    WHERE month BETWEEN ? AND ?
+    GROUP BY month HAVING SUM(bills) > 0 ORDER BY month
+    ''', (first, last))
+    return [(month, round(billed, 2), round(collected, 2)) for month, billed, collected in rows]
+
+def fetch_ar_report(conn, period):
+    # Everything the receivables panel shows for a month: today's aging,
+    # revenue by plan for the month and collections over the year up to it
+    year, month = map(int, period.split('-'))
+    first = f"{year - 1}-{month + 1:02d}" if month < 12 else f"{year}-01"
+    return fetch_ar_aging(conn), fetch_revenue(conn, period), fetch_collections(conn, first, period)
+
+def pay_bill(conn, bill_id):
+    cursor = conn.cursor()
+    paid_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.execute('''
+    UPDATE billing 
+    SET paid=1, payment_date=?, paid_at=?
+    WHERE bill_id=?
+    ''', (paid_at[:10], paid_at, bill_id))
+    conn.commit()
+    
+    return ChangeSet().update('billing', bill_id)
+
+# Dunning stages as (days past due, flat fee, fee as a fraction of the
+# bill before fees, notice). A bill moves to the latest stage it has
+# reached and pays the fees of every stage it moves through. Override with
+# ISP_DUNNING_STAGES, e.g. "1:0:0:reminder,15:5:0:late_fee,30:0:0.1:final_notice".
+DUNNING_STAGES = [
+    (1, 0.0, 0.0, 'reminder'),
+    (15, 0.0, 0.05, 'late_fee'),
+    (30, 0.0, 0.10, 'final_notice'),
+]
+
+def dunning_stages_from_env():
+    value = os.environ.get('ISP_DUNNING_STAGES')
+    if not value:
+        return DUNNING_STAGES
+    stages = []
+    for item in value.split(','):
+        days, fee, rate, notice = item.strip().split(':')
+        stages.append((int(days), float(fee), float(rate), notice))
+    if [stage[0] for stage in stages] != sorted({stage[0] for stage in stages}):
+        raise ValueError("ISP_DUNNING_STAGES must list stages by increasing days past due")
+    return stages
+
+def run_dunning(conn, as_of=None, stages=None, progress=None):
+    # Move every unpaid bill past its due date to the latest stage it has
+    # reached on as_of (default today): add the fees of the stages it moves
+    # through to its late_fees, leaving amount as billed, and queue one
+    # notice for the stage it lands on. Stages are
+    # applied latest first, each as one INSERT into outbox and one UPDATE of
+    # billing over the (paid, dunning_level, due_date) index, all in a
+    # single transaction. A bill already at a stage is not touched again, so
+    # running twice on the same day changes nothing.
+    # Returns (bills moved, notices queued).
+    stages = stages or dunning_stages_from_env()
+    as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor = conn.cursor()
+    
+    # Fees charged from level to stage are the stage totals minus the level's
+    flat_totals = [0.0]
+    rate_totals = [0.0]
+    for days, fee, rate, notice in stages:
+        flat_totals.append(flat_totals[-1] + fee)
+        rate_totals.append(rate_totals[-1] + rate)
+    
+    moved = queued = 0
+    try:
+        for level in range(len(stages), 0, -1):
+            days, fee, rate, notice = stages[level - 1]
+            cutoff = (datetime.strptime(as_of, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+            earlier = ', '.join(str(previous) for previous in range(level))
+            flat = ' '.join(f'WHEN {previous} THEN {flat_totals[level] - flat_totals[previous]!r}'
+                            for previous in range(level))
+            share = ' '.join(f'WHEN {previous} THEN {rate_totals[level] - rate_totals[previous]!r}'
+                             for previous in range(level))
+            late_fee = (f'round((CASE b.dunning_level {flat} END) + '
+                        f'b.amount * (CASE b.dunning_level {share} END), 2)')
+            # Due dates that are not YYYY-MM-DD compare as text and would
+            # pass the cutoff; they stay out until they are corrected
+            due = (f'b.paid = 0 AND b.dunning_level IN ({earlier}) AND b.due_date <= ? '
+                   f"AND b.due_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'")
+            
+            cursor.execute(f'''
+            INSERT OR IGNORE INTO outbox (created_at, kind, customer_id, bill_id, level, payload)
+            SELECT ?, ?, b.customer_id, b.bill_id, ?,
+                   json_object('name', c.name, 'email', c.email, 'phone', c.phone,
+                               'bill_id', b.bill_id, 'due_date', b.due_date,
+                               'late_fee', {late_fee}, 'amount', b.amount + b.late_fees + {late_fee})
+            FROM billing b JOIN customers c ON c.customer_id = b.customer_id
+            WHERE {due}
+            ''', (created_at, notice, level, cutoff))
+            queued += cursor.rowcount
+            
+            cursor.execute(f'''
+            UPDATE billing AS b SET
+                late_fees = b.late_fees + {late_fee},
+                dunning_level = {level}
+            WHERE {due}
+            ''', (cutoff,))
+            moved += cursor.rowcount
+            if progress:
+                progress((len(stages) - level + 1) / len(stages))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return moved, queued
+
+def fetch_outbox(conn, limit=100):
+    # Notices not sent yet, oldest first, as (message_id, kind, payload)
+    return conn.execute('''
+    SELECT message_id, kind, payload FROM outbox
+    WHERE sent_at IS NULL ORDER BY message_id LIMIT ?
+    ''', (limit,)).fetchall()
+
+def mark_sent(conn, message_ids):
+    sent_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn.executemany('UPDATE outbox SET sent_at=? WHERE message_id=?',
+                     ((sent_at, message_id) for message_id in message_ids))
+    conn.commit()
+
+# A payment reference that names a bill, such as "1234", "#1234", "BILL-1234"
+# or "INV 1234"
+BILL_REFERENCE = re.compile(r'\s*(?:bill|inv(?:oice)?)?\s*[#:-]?\s*(\d+)\s*', re.IGNORECASE)
+
+# Customers whose bills are loaded into the match index per query
+RECONCILE_CHUNK = 500
+
+def reconcile_payments(conn, path, exceptions_path=None, progress=None):
+    # Settle open bills from a bank statement, a CSV (with a header row) or
+    # JSONL file of payments with customer_id, amount, reference and an
+    # optional date (default today). The file is streamed twice: first for
+    # the customers it mentions, whose bills are loaded into hash indexes,
+    # then to match each payment, by the bill its reference names when
+    # customer and amount agree, otherwise to the oldest open bill of that
+    # customer for exactly that amount, once every payment naming a bill has
+    # been matched. A payment matches either the amount billed or, once late
+    # fees were charged, the amount billed plus the fees. All matches are applied with one executemany in one
+    # transaction. Payments that match nothing go to exceptions_path
+    # (default <path>.exceptions.csv) with the reason, like rejected import
+    # rows. A reference already applied for the customer is
+    # an exception, so reconciling the same file again changes nothing.
+    # progress(payments read) is called every IMPORT_BATCH payments.
+    # Returns (matched, exceptions, exceptions_path or None).
+    if exceptions_path is None:
+        exceptions_path = path + '.exceptions.csv'
+    
+    customer_ids = set()
+    for line_number, record, error in read_records(path):
+        if not error:
+            try:
+                customer_ids.add(int(record.get('customer_id')))
+            except (TypeError, ValueError):
+                pass
+    
+    # bill_id -> (customer_id, cents billed, cents owed) and (customer_id,
+    # cents) -> bill ids for open bills, oldest due first; bill_id -> customer_id for settled
+    # bills, and the references already applied
+    open_bills = {}
+    by_amount = {}
+    paid_bills = {}
+    applied = set()
+    customer_ids = sorted(customer_ids)
+    for start in range(0, len(customer_ids), RECONCILE_CHUNK):
+        chunk = customer_ids[start:start + RECONCILE_CHUNK]
+        rows = conn.execute(f'''
+        SELECT bill_id, customer_id, amount, late_fees, paid, payment_reference FROM billing
+        WHERE customer_id IN ({', '.join('?' * len(chunk))})
+        ORDER BY due_date, bill_id
+        ''', chunk)
+        for bill_id, customer_id, amount, late_fees, paid, reference in rows:
+            if paid:
+                paid_bills[bill_id] = customer_id
+            else:
+                billed, owed = round(amount * 100), round((amount + late_fees) * 100)
+                open_bills[bill_id] = (customer_id, billed, owed)
+                by_amount.setdefault((customer_id, billed), deque()).append(bill_id)
+                if owed != billed:
+                    by_amount.setdefault((customer_id, owed), deque()).append(bill_id)
+            if reference is not None:
+                applied.add((customer_id, reference))
+    
+    today = datetime.now().strftime('%Y-%m-%d')
+    updates = []
+    unnamed = []
+    matched_bills = set()
+    dates = {}
+    exceptions = read = 0
+    exceptions_file = writer = None
+    
+    def payment(record):
+        # (customer_id, cents, reference, payment date) of a valid payment
+        try:
+            customer_id = int(record.get('customer_id'))
+        except (TypeError, ValueError):
+            raise ValueError("Customer id must be a number")
+        try:
+            amount = float(record.get('amount'))
+        except (TypeError, ValueError):
+            raise ValueError("Amount must be a valid number")
+        if not math.isfinite(amount):
+            raise ValueError("Amount must be a valid number")
+        cents = round(amount * 100)
+        if cents <= 0:
+            raise ValueError("Amount must be positive")
+        reference = str(record.get('reference') or '').strip()
+        if not reference:
+            raise ValueError("Payment has no reference")
+        # A statement covers a few days, so each date is parsed once
+        payment_date = record.get('date') or today
+        if payment_date not in dates:
+            dates[payment_date] = validate_date(payment_date, "Payment date")
+        payment_date = dates[payment_date]
+        already_applied(customer_id, reference)
+        return customer_id, cents, reference, payment_date
+    
+    def already_applied(customer_id, reference):
+        # References are recorded once they settle a bill, so a line that
+        # failed does not block a later one with the same reference
+        if (customer_id, reference) in applied:
+            raise ValueError(f"Reference {reference} already applied for customer {customer_id}")
+    
+    def named_bill(customer_id, cents, reference):
+        # The open bill the reference names, if customer and amount agree
+        named = BILL_REFERENCE.fullmatch(reference)
+        bill_id = int(named.group(1)) if named else None
+        if paid_bills.get(bill_id) == customer_id or (
+                bill_id in matched_bills and open_bills[bill_id][0] == customer_id):
+            raise ValueError(f"Bill #{bill_id} is already paid")
+        bill = open_bills.get(bill_id)
+        return bill_id if bill and bill[0] == customer_id and cents in bill[1:] else None
+    
+    def oldest_bill(customer_id, cents):
+        queue = by_amount.get((customer_id, cents), ())
+        while queue and queue[0] in matched_bills:
+            queue.popleft()
+        if not queue:
+            raise ValueError(f"No open bill of {cents / 100:.2f} for customer {customer_id}")
+        return queue.popleft()
+    
+    def settle(bill_id, customer_id, reference, payment_date):
+        matched_bills.add(bill_id)
+        applied.add((customer_id, reference))
+        updates.append((payment_date, reference, bill_id))
+    
+    def exception(line_number, record, reason, raw=False):
+        nonlocal exceptions_file, writer, exceptions
+        if writer is None:
+            exceptions_file = open(exceptions_path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(exceptions_file)
+            writer.writerow(['line', 'error', 'record'])
+        writer.writerow([line_number, reason, record if raw else json.dumps(record)])
+        exceptions += 1
+    
+    # Payments naming their bill are matched while streaming; the rest are
+    # kept and matched on amount afterwards, so they never take a bill that
+    # a later line names
+    try:
+        for line_number, record, error in read_records(path):
+            read += 1
+            if error:
+                exception(line_number, record, error, raw=True)
+                continue
+            try:
+                customer_id, cents, reference, payment_date = payment(record)
+                bill_id = named_bill(customer_id, cents, reference)
+            except ValueError as e:
+                exception(line_number, record, str(e))
+                continue
+            if bill_id is None:
+                unnamed.append((line_number, record, customer_id, cents, reference, payment_date))
+            else:
+                settle(bill_id, customer_id, reference, payment_date)
+            if progress and read % IMPORT_BATCH == 0:
+                progress(read)
+        
+        for line_number, record, customer_id, cents, reference, payment_date in unnamed:
+            try:
+                already_applied(customer_id, reference)
+                bill_id = oldest_bill(customer_id, cents)
+            except ValueError as e:
+                exception(line_number, record, str(e))
+                continue
+            settle(bill_id, customer_id, reference, payment_date)
+    finally:
+        if exceptions_file:
+            exceptions_file.close()
+    
+    # In bill_id order the updates walk the table and its indexes in step.
+    # Bills paid from elsewhere since they were read are left as they are.
+    updates.sort(key=lambda update: update[2])
+    paid_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        cursor = conn.executemany('''
+        UPDATE billing SET paid=1, payment_date=?, payment_reference=?, paid_at=?
+        WHERE bill_id=? AND paid=0
+        ''', ((payment_date, reference, paid_at, bill_id) for payment_date, reference, bill_id in updates))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if progress:
+        progress(read)
+    
+    return cursor.rowcount, exceptions, exceptions_path if exceptions else None
+
+def insert_technician(conn, name, phone, shift_start, shift_end, latitude, longitude):
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO technicians (name, phone, shift_start, shift_end, latitude, longitude)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (name, phone, shift_start, shift_end, latitude, longitude))
+    conn.commit()
+    
+    return ChangeSet().insert('technicians', cursor.lastrowid)
+
+def modify_technician(conn, technician_id, name, phone, shift_start, shift_end, latitude, longitude):
+    cursor = conn.cursor()
+    cursor.execute('''
+    UPDATE technicians
+    SET name=?, phone=?, shift_start=?, shift_end=?, latitude=?, longitude=?
+    WHERE technician_id=?
+    ''', (name, phone, shift_start, shift_end, latitude, longitude, technician_id))
+    conn.commit()
+    
+    return ChangeSet().update('technicians', technician_id)
+
+def book_visit(conn, technician_id, customer_id, start_at, end_at, issue, session_id=None):
+    # Double bookings are rejected by trg_visits_overlap_insert
+    cursor = conn.cursor()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        cursor.execute('''
+        INSERT INTO visits (technician_id, customer_id, start_at, end_at, issue, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (technician_id, customer_id, start_at, end_at, issue, created_at))
+    except sqlite3.IntegrityError as e:
+        raise ValueError(str(e))
+    if session_id is not None:
+        link_troubleshooting_session(conn, session_id, customer_id, visit_id=cursor.lastrowid)
+    conn.commit()
+    
+    return ChangeSet().insert('visits', cursor.lastrowid)
+
+# Booked minutes a technician counts as a full day in the capacity view
+WORKDAY_MINUTES = 8 * 60
+
+def fetch_capacity(conn, first_day, days):
+    # Visits and booked minutes per technician and day, for the days
+    # starting at first_day (YYYY-MM-DD). Returns (technicians, usage) where
+    # usage maps (technician_id, day) to (visits, minutes).
+    technicians = conn.execute('SELECT technician_id, name FROM technicians ORDER BY name').fetchall()
+    usage = {}
+    for technician_id, day, visits, minutes in conn.execute('''
+    SELECT technician_id, substr(start_at, 1, 10), COUNT(*),
+           SUM((julianday(end_at) - julianday(start_at)) * 1440)
+    FROM visits
+    WHERE start_at >= ? AND start_at < date(?, ?)
+    GROUP BY technician_id, substr(start_at, 1, 10)
+    ''', (first_day, first_day, f'+{days} days')):
+        usage[(technician_id, day)] = (visits, round(minutes))
+    return technicians, usage
+
+# Dispatch. Travel times are estimated offline from straight-line distance
+# at DISPATCH_SPEED_KMH; a job or base without coordinates costs
+# DISPATCH_UNKNOWN_TRAVEL minutes to reach. Times inside the solver are
+# minutes since midnight of the dispatch day.
+DISPATCH_SPEED_KMH = 25
+DISPATCH_VISIT_MINUTES = 60
+DISPATCH_UNKNOWN_TRAVEL = 30
+
+def travel_minutes(origin, destination):
+    if origin is None or destination is None:
+        return DISPATCH_UNKNOWN_TRAVEL
+    # Equirectangular approximation, accurate to well under 1% within a city
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    x = (lon2 - lon1) * math.cos((lat1 + lat2) / 2)
+    km = 6371 * math.hypot(x, lat2 - lat1)
+    return math.ceil(km / DISPATCH_SPEED_KMH * 60)
+
+def earliest_slot(busy, start, duration, shift_end):
+    # First start >= start at which duration minutes fit between the sorted
+    # busy (start, end) intervals and before shift_end, or None
+    for busy_start, busy_end in busy:
+        if busy_end <= start:
+            continue
+        if start + duration <= busy_start:
+            break
+        start = busy_end
+    return start if start + duration <= shift_end else None
+
+def plan_dispatch(jobs, technicians, duration=DISPATCH_VISIT_MINUTES):
+    # Greedy route building with time windows. jobs are (job_id, location)
+    # in priority order; technicians are (technician_id, base location,
+    # shift start, shift end, sorted busy intervals). Each job goes to the
+    # technician who can finish it first, counting travel from where that
+    # technician's route currently ends, and extends that route. Returns
+    # (assignments, unassigned) with assignments as (job_id, technician_id,
+    # start, end, travel).
+    routes = [[technician_id, location, shift_start, shift_end, busy]
+              for technician_id, location, shift_start, shift_end, busy in technicians]
+    assignments = []
+    unassigned = []
+    
+    for job_id, location in jobs:
+        best = None
+        for route in routes:
+            technician_id, position, available, shift_end, busy = route
+            travel = travel_minutes(position, location)
+            start = earliest_slot(busy, available + travel, duration, shift_end)
+            if start is None:
+                continue
+            key = (start + duration, travel, technician_id)
+            if best is None or key < best[0]:
+                best = (key, route, start, travel)
+        
+        if best is None:
+            unassigned.append(job_id)
+            continue
+        key, route, start, travel = best
+        route[1] = location
+        route[2] = start + duration
+        assignments.append((job_id, route[0], start, start + duration, travel))
+        # A full day takes no more jobs, so stop pricing it
+        if route[2] + duration > route[3]:
+            routes.remove(route)
+    
+    return assignments, unassigned
+
+def minutes_of(clock):
+    hours, minutes = clock.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def prepare_dispatch(conn, day):
+    # Plan visits on day (YYYY-MM-DD) for open complaints that have no visit
+    # yet, oldest complaint first, around the visits already booked that
+    # day. Returns (assignments, unassigned) with assignments as
+    # (complaint_id, technician_id, customer_id, start_at, end_at, issue).
+    jobs = conn.execute('''
+    SELECT co.complaint_id, co.customer_id, co.description, c.latitude, c.longitude
+    FROM complaints co JOIN customers c ON co.customer_id = c.customer_id
+    WHERE co.status IN ('Open', 'In Progress')
+      AND NOT EXISTS (SELECT 1 FROM visits v WHERE v.complaint_id = co.complaint_id)
+    ORDER BY co.date, co.complaint_id
+    ''').fetchall()
+    
+    # Busy intervals are the day's visits plus, since a technician's visits
+    # never overlap, at most one earlier visit per technician running past
+    # midnight, clipped to the day
+    midnight = datetime.strptime(day, '%Y-%m-%d')
+    busy = {}
+    for technician_id, start_at, end_at in conn.execute('''
+    SELECT technician_id, start_at, end_at FROM visits
+    WHERE start_at >= ?1 AND start_at < date(?1, '+1 day')
+    UNION ALL
+    SELECT v.technician_id, v.start_at, v.end_at
+    FROM technicians t JOIN visits v ON v.visit_id = (
+        SELECT visit_id FROM visits
+        WHERE technician_id = t.technician_id AND start_at < ?1
+        ORDER BY start_at DESC LIMIT 1)
+    WHERE v.end_at > ?1
+    ORDER BY 1, 2
+    ''', (day,)):
+        start = (datetime.strptime(start_at, '%Y-%m-%d %H:%M:%S') - midnight).total_seconds() / 60
+        end = (datetime.strptime(end_at, '%Y-%m-%d %H:%M:%S') - midnight).total_seconds() / 60
+        busy.setdefault(technician_id, []).append((max(math.floor(start), 0), min(math.ceil(end), 24 * 60)))
+    
+    technicians = [
+        (technician_id, None if latitude is None else (latitude, longitude),
+         minutes_of(shift_start), minutes_of(shift_end), busy.get(technician_id, []))
+        for technician_id, latitude, longitude, shift_start, shift_end in conn.execute(
+            'SELECT technician_id, latitude, longitude, shift_start, shift_end FROM technicians')]
+    
+    details = {}
+    for complaint_id, customer_id, description, latitude, longitude in jobs:
+        details[complaint_id] = (customer_id, description,
+                                 None if latitude is None else (latitude, longitude))
+    planned, unassigned = plan_dispatch(
+        [(complaint_id, location) for complaint_id, (customer_id, description, location) in details.items()],
+        technicians)
+    
+    assignments = []
+    for complaint_id, technician_id, start, end, travel in planned:
+        customer_id, description = details[complaint_id][:2]
+        assignments.append((complaint_id, technician_id, customer_id,
+                            (midnight + timedelta(minutes=start)).strftime('%Y-%m-%d %H:%M:%S'),
+                            (midnight + timedelta(minutes=end)).strftime('%Y-%m-%d %H:%M:%S'),
+                            description))
+    return assignments, unassigned
+
+def book_dispatch(conn, assignments):
+    # All or nothing: a visit booked meanwhile that clashes with the plan
+    # rolls the whole plan back through the overlap trigger
+    cursor = conn.cursor()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    visit_ids = []
+    try:
+        for complaint_id, technician_id, customer_id, start_at, end_at, issue in assignments:
+            cursor.execute('''
+            INSERT INTO visits (technician_id, customer_id, complaint_id, start_at, end_at, issue, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (technician_id, customer_id, complaint_id, start_at, end_at, issue, created_at))
+            visit_ids.append(cursor.lastrowid)
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        raise ValueError(f"{e}; plan the dispatch again")
+    conn.commit()
+    
+    return ChangeSet().insert('visits', *visit_ids)
+
+# Troubleshooting guides live in a JSON file next to the application so
+# support staff can add issues without touching the code; ISP_TROUBLESHOOTING
+# points at a different file
+TROUBLESHOOTING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'troubleshooting.json')
+
+class TroubleshootingGuide:
+    # A decision tree compiled from the guide file. issues lists (issue_id,
+    # title) in file order, starts maps an issue to its first node, and nodes
+    # maps a node id to (steps, question, answers) where answers is a tuple
+    # of (label, next node id) and is empty on the last node of a flow.
+    def __init__(self, issues, starts, nodes):
+        self.issues = issues
+        self.starts = starts
+        self.nodes = nodes
+    
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.environ.get('ISP_TROUBLESHOOTING', TROUBLESHOOTING_PATH)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        try:
+            return cls.compile(data)
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"{path}: malformed guide ({e!r})")
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+    
+    @classmethod
+    def compile(cls, data):
+        nodes = {}
+        for node_id, node in data['nodes'].items():
+            steps = tuple(str(step) for step in node.get('steps', []))
+            question = node.get('question')
+            answers = tuple((str(label), next_id) for label, next_id in node.get('answers', {}).items())
+            if bool(question) != bool(answers):
+                raise ValueError(f"node '{node_id}' needs both a question and answers, or neither")
+            nodes[node_id] = (steps, question, answers)
+        
+        # Every branch has to lead somewhere, so a flow can't dead-end halfway
+        for node_id, (steps, question, answers) in nodes.items():
+            for label, next_id in answers:
+                if next_id not in nodes:
+                    raise ValueError(f"answer '{label}' of node '{node_id}' leads to unknown node '{next_id}'")
+        
+        issues = []
+        starts = {}
+        for issue in data['issues']:
+            issue_id, title, start = issue['id'], issue['title'], issue['start']
+            if issue_id in starts:
+                raise ValueError(f"issue '{issue_id}' is listed twice")
+            if start not in nodes:
+                raise ValueError(f"issue '{issue_id}' starts at unknown node '{start}'")
+            issues.append((issue_id, title))
+            starts[issue_id] = start
+        return cls(issues, starts, nodes)
+
+# Usage metering. Records are customer_id, timestamp (epoch seconds or
+# YYYY-MM-DD HH:MM:SS) and the bytes in and out since the customer's
+# previous record, as a RADIUS accounting collector exports them.
+USAGE_FIELDS = ('customer_id', 'timestamp', 'bytes_in', 'bytes_out')
+# Distinct (customer, hour) slots buffered before a flush
+USAGE_FLUSH = 200000
+# Days of hourly detail kept by prune_usage; daily totals are kept for good
+USAGE_HOURLY_DAYS = 35
+USAGE_PORT = 9813
+
+class UsageMeter:
+    # Accumulates usage records into per (customer, hour) slots held in flat
+    # arrays, so a burst of records for the same subscriber costs one dict
+    # lookup and two array additions each. flush() writes the slots as
+    # hourly and daily upserts in one transaction and flags the customers
+    # they push past their plan's data limit for the month.
+    def __init__(self, conn, flush_slots=USAGE_FLUSH):
+        self.conn = conn
+        self.flush_slots = flush_slots
+        self.slots = {}
+        self.customers = array('q')
+        self.hours = []
+        self.bytes_in = array('q')
+        self.bytes_out = array('q')
+        self.hour_names = {}
+        self.records = 0
+    
+    def hour_of(self, stamp):
+        # 'YYYY-MM-DD HH' of a timestamp, parsed once per distinct hour
+        key = int(stamp) // 3600 if stamp.isdigit() else stamp[:13]
+        hour = self.hour_names.get(key)
+        if hour is None:
+            try:
+                if isinstance(key, int):
+                    hour = datetime.fromtimestamp(key * 3600).strftime('%Y-%m-%d %H')
+                else:
+                    hour = datetime.strptime(key.replace('T', ' '), '%Y-%m-%d %H').strftime('%Y-%m-%d %H')
+            except (ValueError, OverflowError, OSError):
+                raise ValueError(f"Unreadable timestamp {stamp!r}")
+            self.hour_names[key] = hour
+        return hour
+    
+    def add(self, customer_id, stamp, bytes_in, bytes_out):
+        # One record, as the strings read from a file or socket
+        try:
+            customer_id, bytes_in, bytes_out = int(customer_id), int(bytes_in), int(bytes_out)
+        except ValueError:
+            raise ValueError("Customer id and byte counts must be whole numbers")
+        if bytes_in < 0 or bytes_out < 0:
+            raise ValueError("Byte counts cannot be negative")
+        hour = self.hour_of(stamp)
+        
+        slot = self.slots.get((customer_id, hour))
+        if slot is None:
+            slot = self.slots[(customer_id, hour)] = len(self.hours)
+            self.customers.append(customer_id)
+            self.hours.append(hour)
+            self.bytes_in.append(bytes_in)
+            self.bytes_out.append(bytes_out)
+        else:
+            self.bytes_in[slot] += bytes_in
+            self.bytes_out[slot] += bytes_out
+        self.records += 1
+        if len(self.hours) >= self.flush_slots:
+            self.flush()
+    
+    def flush(self):
+        # Returns the number of customers newly flagged
+        if not self.hours:
+            return 0
+        hourly = zip(self.hours, self.customers, self.bytes_in, self.bytes_out)
+        daily = {}
+        for customer_id, hour, bytes_in, bytes_out in zip(self.customers, self.hours, self.bytes_in, self.bytes_out):
+            key = (customer_id, hour[:10])
+            total = daily.get(key)
+            daily[key] = (bytes_in, bytes_out) if total is None else (total[0] + bytes_in, total[1] + bytes_out)
+        months = {}
+        for customer_id, day in daily:
+            months.setdefault(day[:7], set()).add(customer_id)
+        
+        try:
+            self.conn.executemany('''
+            INSERT INTO usage_hourly (hour, customer_id, bytes_in, bytes_out) VALUES (?, ?, ?, ?)
+            ON CONFLICT (hour, customer_id) DO UPDATE SET
+                bytes_in = bytes_in + excluded.bytes_in,
+                bytes_out = bytes_out + excluded.bytes_out
+            ''', sorted(hourly))
+            self.conn.executemany('''
+            INSERT INTO usage_daily (customer_id, day, bytes_in, bytes_out) VALUES (?, ?, ?, ?)
+            ON CONFLICT (customer_id, day) DO UPDATE SET
+                bytes_in = bytes_in + excluded.bytes_in,
+                bytes_out = bytes_out + excluded.bytes_out
+            ''', sorted(key + total for key, total in daily.items()))
+            flagged = sum(flag_over_limit(self.conn, period, customer_ids)
+                          for period, customer_ids in months.items())
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        
+        self.slots.clear()
+        self.customers = array('q')
+        self.hours = []
+        self.bytes_in = array('q')
+        self.bytes_out = array('q')
+        return flagged
+
+def flag_over_limit(conn, period, customer_ids):
+    # Record in usage_alerts which of customer_ids used more than their
+    # plan's data limit in period (YYYY-MM). Does not commit. Returns the
+    # number of customers flagged for the period for the first time.
+    limits = {plan_id: parse_data_limit(data_limit)
+              for plan_id, data_limit in conn.execute('SELECT plan_id, data_limit FROM plans')}
+    flagged_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    customer_ids = sorted(customer_ids)
+    flagged = 0
+    for start in range(0, len(customer_ids), RECONCILE_CHUNK):
+        chunk = customer_ids[start:start + RECONCILE_CHUNK]
+        rows = conn.execute(f'''
+        SELECT c.customer_id, c.plan_id, SUM(d.bytes_in + d.bytes_out)
+        FROM customers c JOIN usage_daily d ON d.customer_id = c.customer_id
+        WHERE c.customer_id IN ({', '.join('?' * len(chunk))})
+          AND d.day BETWEEN ? AND ?
+        GROUP BY c.customer_id
+        ''', chunk + [f'{period}-01', f'{period}-31'])
+        over = [(period, customer_id, used, limits[plan_id], flagged_at)
+                for customer_id, plan_id, used in rows
+                if limits.get(plan_id) is not None and used > limits[plan_id]]
+        if not over:
+            continue
+        known = {row[0] for row in conn.execute(f'''
+        SELECT customer_id FROM usage_alerts
+        WHERE period = ? AND customer_id IN ({', '.join('?' * len(over))})
+        ''', [period] + [alert[1] for alert in over])}
+        conn.executemany('''
+        INSERT INTO usage_alerts (period, customer_id, used, data_limit, flagged_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (period, customer_id) DO UPDATE SET used = excluded.used, data_limit = excluded.data_limit
+        ''', over)
+        flagged += len(over) - len(known)
+    return flagged
+
+def prune_usage(conn, days=USAGE_HOURLY_DAYS):
+    cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H')
+    cursor = conn.execute('DELETE FROM usage_hourly WHERE hour < ?', (cutoff,))
+    conn.commit()
+    return cursor.rowcount
+
+def read_usage(lines):
+    # Yield (line number, fields, error) from CSV lines with a header row
+    # naming at least USAGE_FIELDS, in any order
+    reader = csv.reader(lines)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [field for field in USAGE_FIELDS if field not in header]
+    if missing:
+        raise ValueError(f"Usage file has no {', '.join(missing)} column")
+    columns = [header.index(field) for field in USAGE_FIELDS]
+    width = max(columns) + 1
+    for fields in reader:
+        if len(fields) < width:
+            if fields:
+                yield reader.line_num, fields, "Too few columns"
+            continue
+        yield reader.line_num, [fields[column] for column in columns], None
+
+def ingest_usage(conn, path, rejects_path=None, progress=None):
+    # Stream a usage file through a UsageMeter. Rejected lines go to
+    # rejects_path (default <path>.rejects.csv) like rejected import rows.
+    # Returns (records, rejected, customers flagged, rejects_path or None).
+    if rejects_path is None:
+        rejects_path = path + '.rejects.csv'
+    meter = UsageMeter(conn)
+    rejected = flagged = 0
+    rejects_file = rejects = None
+    
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            for line_number, fields, error in read_usage(f):
+                try:
+                    if error:
+                        raise ValueError(error)
+                    meter.add(*fields)
+                except ValueError as e:
+                    if rejects is None:
+                        rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                        rejects = csv.writer(rejects_file)
+                        rejects.writerow(['line', 'error', 'record'])
+                    rejects.writerow([line_number, str(e), ','.join(fields)])
+                    rejected += 1
+                if progress and line_number % IMPORT_BATCH == 0:
+                    progress(line_number)
+        flagged = meter.flush()
+    finally:
+        if rejects_file:
+            rejects_file.close()
+    
+    return meter.records, rejected, flagged, rejects_path if rejected else None
+
+def listen_usage(conn, port=USAGE_PORT, flush_seconds=60, report=None):
+    # Meter records sent as CSV lines (customer_id,timestamp,bytes_in,
+    # bytes_out) in UDP datagrams to port on this machine, flushing every
+    # flush_seconds, until interrupted. report(records, flagged) is called
+    # after each flush that wrote something.
+    meter = UsageMeter(conn)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listener.bind(('127.0.0.1', port))
+    listener.settimeout(1.0)
+    next_flush = time.monotonic() + flush_seconds
+    try:
+        while True:
+            try:
+                data = listener.recv(65536)
+            except socket.timeout:
+                data = b''
+            for line in data.decode('utf-8', 'replace').splitlines():
+                try:
+                    meter.add(*line.split(','))
+                except (TypeError, ValueError):
+                    pass
+            if time.monotonic() >= next_flush:
+                if meter.hours:
+                    flagged = meter.flush()
+                    if report:
+                        report(meter.records, flagged)
+                next_flush = time.monotonic() + flush_seconds
+    finally:
+        meter.flush()
+        listener.close()
+
+def fetch_usage_alerts(conn, period):
+    # (customer_id, name, plan, used bytes, limit bytes) over the limit in period
+    return conn.execute('''
+    SELECT a.customer_id, c.name, p.name, a.used, a.data_limit
+    FROM usage_alerts a
+    JOIN customers c ON c.customer_id = a.customer_id
+    LEFT JOIN plans p ON p.plan_id = c.plan_id
+    WHERE a.period = ?
+    ORDER BY a.used * 1.0 / a.data_limit DESC
+    ''', (period,)).fetchall()
+
+# Row types returned by the services, one field per column
+Customer = namedtuple('Customer', 'customer_id name address phone email plan_id registration_date latitude longitude')
+Plan = namedtuple('Plan', 'plan_id name speed price data_limit description')
+Complaint = namedtuple('Complaint', 'complaint_id customer_id description date status resolution')
+Bill = namedtuple('Bill', 'bill_id customer_id amount due_date paid payment_date billing_period plan_id created_at '
+                         'late_fees dunning_level payment_reference paid_at')
+
+# Rows read per query by Service.page and Service.scan
+SERVICE_PAGE = 1000
+
+class Service:
+    # Access to one table without the desktop application, for scripts, the
+    # command line and the benchmarks. Reads return row objects. Single-row
+    # writes go through the same functions as the application and return
+    # their ChangeSet; bulk writes run in one transaction, all or nothing,
+    # and return the number of rows written.
+    table = None
+    key = None
+    row = None
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.columns = ', '.join(self.row._fields)
+    
+    def get(self, row_id):
+        row = self.conn.execute(f'SELECT {self.columns} FROM {self.table} WHERE {self.key}=?',
+                                (row_id,)).fetchone()
+        return None if row is None else self.row._make(row)
+    
+    def page(self, after=0, limit=SERVICE_PAGE):
+        # The rows with a key above after, in key order
+        rows = self.conn.execute(f'''
+        SELECT {self.columns} FROM {self.table}
+        WHERE {self.key} > ? ORDER BY {self.key} LIMIT ?
+        ''', (after, limit))
+        return [self.row._make(row) for row in rows]
+    
+    def scan(self, limit=SERVICE_PAGE):
+        # Every row in key order, a page at a time
+        after = 0
+        while True:
+            rows = self.page(after, limit)
+            yield from rows
+            if len(rows) < limit:
+                return
+            after = rows[-1][0]
+    
+    def count(self):
+        return self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+    
+    def where(self, condition, params=()):
+        rows = self.conn.execute(f'SELECT {self.columns} FROM {self.table} WHERE {condition}', params)
+        return [self.row._make(row) for row in rows]
+    
+    def write_many(self, sql, rows):
+        try:
+            cursor = self.conn.executemany(sql, rows)
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return cursor.rowcount
+
+def numbered(records, validate, kind):
+    # Validated records, with the failing record's number in the error
+    for number, record in enumerate(records, 1):
+        try:
+            yield validate(*record)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{kind} {number}: {e}")
+
+class CustomerService(Service):
+    table = 'customers'
+    key = 'customer_id'
+    row = Customer
+    
+    def add(self, name, address, phone, email, plan_id=None):
+        return insert_customer(self.conn, *validate_customer(name, address, phone, email, plan_id))
+    
+    def update(self, customer_id, name, address, phone, email, plan_id=None):
+        return modify_customer(self.conn, customer_id, *validate_customer(name, address, phone, email, plan_id))
+    
+    def remove(self, customer_id):
+        return remove_customer(self.conn, customer_id)
+    
+    def add_many(self, records):
+        # records are (name, address, phone, email, plan_id) tuples
+        registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        known_plans = {row[0] for row in self.conn.execute('SELECT plan_id FROM plans')}
+        
+        def validate(*record):
+            values = validate_customer(*record)
+            if values[4] is not None and values[4] not in known_plans:
+                raise ValueError(f"Unknown plan id {values[4]}")
+            return values + (registration_date,)
+        
+        return self.write_many('''
+        INSERT INTO customers (name, address, phone, email, plan_id, registration_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', numbered(records, validate, "Customer"))
+    
+    def change_plan(self, customer_ids, plan_id):
+        return self.write_many('UPDATE customers SET plan_id=? WHERE customer_id=?',
+                               ((plan_id, customer_id) for customer_id in customer_ids))
+    
+    def search(self, text, limit=SEARCH_LIMIT):
+        match = fts_query(text)
+        if match is None:
+            return []
+        rows = self.conn.execute(f'''
+        SELECT {', '.join('c.' + field for field in Customer._fields)}
+        FROM (SELECT rowid, rank FROM customers_fts WHERE customers_fts MATCH ?
+              LIMIT {SEARCH_CANDIDATES}) f
+        JOIN customers c ON c.customer_id = f.rowid
+        ORDER BY f.rank LIMIT ?
+        ''', (match, limit))
+        return [Customer._make(row) for row in rows]
+
+class PlanService(Service):
+    table = 'plans'
+    key = 'plan_id'
+    row = Plan
+    
+    def add(self, name, speed, price, data_limit='', description=''):
+        return insert_plan(self.conn, *validate_plan(name, speed, price, data_limit, description))
+    
+    def update(self, plan_id, name, speed, price, data_limit='', description=''):
+        return modify_plan(self.conn, plan_id, *validate_plan(name, speed, price, data_limit, description))
+    
+    def remove(self, plan_id):
+        return remove_plan(self.conn, plan_id)
+    
+    def add_many(self, records):
+        # records are (name, speed, price, data_limit, description) tuples
+        return self.write_many('''
+        INSERT INTO plans (name, speed, price, data_limit, description)
+        VALUES (?, ?, ?, ?, ?)
+        ''', numbered(records, validate_plan, "Plan"))
+
+COMPLAINT_STATUSES = ['Open', 'In Progress', 'Resolved']
+
+def validate_complaint(customer_id, description, status='Open'):
+    if customer_id in (None, '') or not description:
+        raise ValueError("Please fill all required fields")
+    if status not in COMPLAINT_STATUSES:
+        raise ValueError(f"Status must be one of {', '.join(COMPLAINT_STATUSES)}")
+    return int(customer_id), description, status
+
+def validate_bill(customer_id, amount, due_date):
+    if customer_id in (None, '') or amount in (None, '') or not due_date:
+        raise ValueError("Please fill all required fields")
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError("Amount must be a valid number")
+    if not math.isfinite(amount):
+        raise ValueError("Amount must be a valid number")
+    if amount < 0:
+        raise ValueError("Amount cannot be negative")
+    return int(customer_id), amount, validate_date(due_date, "Due date")
+
+class ComplaintService(Service):
+    table = 'complaints'
+    key = 'complaint_id'
+    row = Complaint
+    
+    def add(self, customer_id, description, status='Open'):
+        return insert_complaint(self.conn, *validate_complaint(customer_id, description, status))
+    
+    def close(self, complaint_id, resolution):
+        return close_complaint(self.conn, complaint_id, resolution)
+    
+    def add_many(self, records):
+        # records are (customer_id, description[, status]) tuples
+        date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self.write_many('''
+        INSERT INTO complaints (customer_id, description, status, date)
+        VALUES (?, ?, ?, ?)
+        ''', (values + (date,) for values in numbered(records, validate_complaint, "Complaint")))
+    
+    def close_many(self, complaint_ids, resolution):
+        return self.write_many('''
+        UPDATE complaints SET status='Resolved', resolution=?
+        WHERE complaint_id=?
+        ''', ((resolution, complaint_id) for complaint_id in complaint_ids))
+    
+    def for_customer(self, customer_id):
+        return self.where('customer_id=? ORDER BY date', (customer_id,))
+
+class BillingService(Service):
+    table = 'billing'
+    key = 'bill_id'
+    row = Bill
+    
+    def add(self, customer_id, amount, due_date):
+        return insert_bill(self.conn, *validate_bill(customer_id, amount, due_date))
+    
+    def pay(self, bill_id):
+        return pay_bill(self.conn, bill_id)
+    
+    def run_cycle(self, period, due_date, progress=None):
+        return generate_billing_cycle(self.conn, period, validate_date(due_date, "Due date"), progress)
+    
+    def reconcile(self, path, exceptions_path=None, progress=None):
+        return reconcile_payments(self.conn, path, exceptions_path, progress)
+    
+    def run_dunning(self, as_of=None, stages=None, progress=None):
+        if as_of is not None:
+            as_of = validate_date(as_of, "Date")
+        return run_dunning(self.conn, as_of, stages, progress)
+    
+    def aging(self, as_of=None):
+        return fetch_ar_aging(self.conn, as_of)
+    
+    def revenue(self, period):
+        return fetch_revenue(self.conn, period)
+    
+    def collections(self, first, last):
+        return fetch_collections(self.conn, first, last)
+    
+    def add_many(self, records):
+        # records are (customer_id, amount, due_date) tuples
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self.write_many('''
+        INSERT INTO billing (customer_id, amount, due_date, created_at)
+        VALUES (?, ?, ?, ?)
+        ''', (values + (created_at,) for values in numbered(records, validate_bill, "Bill")))
+    
+    def pay_many(self, bill_ids):
+        # Bills already paid keep their payment date
+        paid_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self.write_many('''
+        UPDATE billing SET paid=1, payment_date=?, paid_at=?
+        WHERE bill_id=? AND paid=0
+        ''', ((paid_at[:10], paid_at, bill_id) for bill_id in bill_ids))
+    
+    def for_customer(self, customer_id):
+        return self.where('customer_id=? ORDER BY due_date', (customer_id,))
+
+def main(argv=None):
+    # Command line front end. The desktop application passes its arguments
+    # here when it is started with a command.
+    parser = argparse.ArgumentParser(description="V.T. ISP System")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="bulk import customers or plans from CSV/JSONL")
+    importer.add_argument('table', choices=sorted(IMPORTS))
+    importer.add_argument('path')
+    importer.add_argument('--rejects', help="file for rejected rows (default <path>.rejects.csv)")
+    exporter = commands.add_parser('export', help="export customers, complaints or billing to CSV/Parquet")
+    exporter.add_argument('table', choices=sorted(EXPORTS))
+    exporter.add_argument('path', help="output file, written as Parquet when it ends in .parquet")
+    billing_run = commands.add_parser('billing-run', help="bill every subscribed customer for a month")
+    billing_run.add_argument('period', help="billing month, YYYY-MM")
+    billing_run.add_argument('due_date', help="due date of the bills, YYYY-MM-DD")
+    reconcile = commands.add_parser('reconcile', help="mark bills paid from a bank statement (CSV/JSONL)")
+    reconcile.add_argument('path', help="payments with customer_id, amount, reference and optional date")
+    reconcile.add_argument('--exceptions', help="file for unmatched payments (default <path>.exceptions.csv)")
+    dunning = commands.add_parser('dunning-run', help="charge late fees and queue reminders for overdue bills")
+    dunning.add_argument('--as-of', help="run as of this date, YYYY-MM-DD (default today)")
+    usage_import = commands.add_parser('usage-import', help="meter subscriber usage from a CSV file")
+    usage_import.add_argument('path', help="CSV with customer_id, timestamp, bytes_in and bytes_out columns")
+    usage_import.add_argument('--rejects', help="file for rejected lines (default <path>.rejects.csv)")
+    usage_listen = commands.add_parser('usage-listen', help="meter usage records sent over UDP to this machine")
+    usage_listen.add_argument('--port', type=int, default=USAGE_PORT)
+    usage_listen.add_argument('--flush-seconds', type=float, default=60)
+    usage_alerts = commands.add_parser('usage-alerts', help="customers over their plan's data limit")
+    usage_alerts.add_argument('period', nargs='?', default=datetime.now().strftime('%Y-%m'),
+                              help="month, YYYY-MM (default this month)")
+    ar_report = commands.add_parser('ar-report', help="receivables aging, revenue and collections for a month")
+    ar_report.add_argument('period', help="month, YYYY-MM")
+    args = parser.parse_args(argv)
+    
+    conn = DBConfig.from_env().connect()
+    migrate(conn)
+    start = time.perf_counter()
+    
+    if args.command == 'import':
+        try:
+            imported, rejected, rejects_path = import_records(
+                conn, args.table, args.path, args.rejects,
+                progress=lambda read: print(f"\r{read} rows read", end='', flush=True))
+        except (OSError, RuntimeError) as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+        print(f"\nImported {imported} {args.table} in {time.perf_counter() - start:.1f}s, {rejected} rejected")
+        if rejects_path:
+            print(f"Rejected rows written to {rejects_path}")
+        return
+    
+    if args.command == 'export':
+        try:
+            written = export_records(conn, args.table, args.path,
+                                     progress=lambda count: print(f"\r{count} rows written", end='', flush=True))
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+        print(f"\nExported {written} {args.table} rows in {time.perf_counter() - start:.1f}s")
+        return
+    
+    if args.command == 'usage-import':
+        try:
+            records, rejected, flagged, rejects_path = ingest_usage(
+                conn, args.path, args.rejects,
+                progress=lambda read: print(f"\r{read} lines read", end='', flush=True))
+            prune_usage(conn)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+        seconds = time.perf_counter() - start
+        print(f"\nMetered {records} records in {seconds:.1f}s ({records / max(seconds, 1e-9):.0f}/s), "
+              f"{rejected} rejected, {flagged} customers newly over their data limit")
+        if rejects_path:
+            print(f"Rejected lines written to {rejects_path}")
+        return
+    
+    if args.command == 'usage-listen':
+        print(f"Listening for usage records on 127.0.0.1:{args.port}, Ctrl+C to stop")
+        try:
+            listen_usage(conn, args.port, args.flush_seconds,
+                         report=lambda records, flagged: print(f"{records} records metered, "
+                                                               f"{flagged} customers newly over their limit"))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            prune_usage(conn)
+            conn.close()
+        return
+    
+    if args.command == 'usage-alerts':
+        alerts = fetch_usage_alerts(conn, args.period)
+        conn.close()
+        for customer_id, name, plan, used, data_limit in alerts:
+            print(f"{customer_id:>8}  {name[:24]:<24}  {(plan or '-')[:16]:<16}"
+                  f"{used / 1e9:>10.1f} GB of {data_limit / 1e9:.1f} GB")
+        print(f"{len(alerts)} customers over their data limit in {args.period}")
+        return
+    
+    if args.command in ('billing-run', 'ar-report'):
+        try:
+            datetime.strptime(args.period, '%Y-%m')
+        except ValueError:
+            parser.exit(1, "Period must be in YYYY-MM format\n")
+    if args.command == 'billing-run':
+        try:
+            args.due_date = validate_date(args.due_date, "Due date")
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+        created = BillingService(conn).run_cycle(
+            args.period, args.due_date,
+            progress=lambda fraction: print(f"\r{fraction:.0%} done", end='', flush=True))
+        conn.close()
+        print(f"\nGenerated {created} bills for {args.period} in {time.perf_counter() - start:.1f}s")
+        return
+    
+    if args.command == 'reconcile':
+        try:
+            matched, exceptions, exceptions_path = reconcile_payments(
+                conn, args.path, args.exceptions,
+                progress=lambda read: print(f"\r{read} payments read", end='', flush=True))
+        except (OSError, RuntimeError) as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+        print(f"\nMatched {matched} payments in {time.perf_counter() - start:.1f}s, {exceptions} exceptions")
+        if exceptions_path:
+            print(f"Unmatched payments written to {exceptions_path}")
+        return
+    
+    if args.command == 'dunning-run':
+        try:
+            moved, queued = BillingService(conn).run_dunning(args.as_of)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+        finally:
+            conn.close()
+        print(f"{moved} overdue bills moved to a new stage, {queued} notices queued "
+              f"in {time.perf_counter() - start:.1f}s")
+        return
+    
+    if args.command == 'ar-report':
+        aging, revenue, collections = fetch_ar_report(conn, args.period)
+        conn.close()
+        print("Unpaid bills by age")
+        for bucket, bills, amount in aging:
+            print(f"  {bucket:<22}{bills:>10}{amount:>16.2f}")
+        print(f"\nRevenue for {args.period}")
+        for plan, bills, billed, paid_bills, collected in revenue:
+            print(f"  {plan:<22}{bills:>10}{billed:>16.2f}{collected:>16.2f}"
+                  f"{collected / billed if billed else 0:>8.0%}")
+        print("\nCollections")
+        for month, billed, collected in collections:
+            print(f"  {month:<22}{billed:>16.2f}{collected:>16.2f}{collected / billed if billed else 0:>8.0%}")
+        return
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Monthly billing runs against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+from unittest import mock
+
+import isp_core
+from isp_core import BillingService, CustomerService, migrate
+
+class BillingCycleTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO plans (name, speed, price, data_limit) VALUES ('Basic', '50 Mbps', 20.0, '100 GB')")
+        CustomerService(self.conn).add_many([("Customer", "Main Street", "555", "c@example.com", 1)] * 5)
+        self.billing = BillingService(self.conn)
+    
+    def bills(self):
+        return self.conn.execute('SELECT COUNT(*) FROM billing').fetchone()[0]
+    
+    def test_a_failed_run_leaves_no_bills(self):
+        def progress(fraction):
+            if fraction > 0.5:
+                raise RuntimeError("Cancelled")
+        with mock.patch.object(isp_core, 'BILLING_CHUNK', 2), self.assertRaisesRegex(RuntimeError, "Cancelled"):
+            self.billing.run_cycle('2024-02', '2024-02-28', progress=progress)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.bills(), 0)
+        
+        self.assertEqual(self.billing.run_cycle('2024-02', '2024-02-28'), 5)
+        self.assertEqual(self.billing.run_cycle('2024-02', '2024-02-28'), 0)
+        self.assertEqual(self.bills(), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# Command line smoke tests, run against a scratch database.
+#
+#   python -m unittest discover tests
+
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from isp_core import main, migrate
+
+class CommandLineTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.database = os.path.join(self.tmp, 'isp.db')
+        environ = mock.patch.dict(os.environ, {'ISP_DB_PATH': self.database})
+        environ.start()
+        self.addCleanup(environ.stop)
+        
+        conn = sqlite3.connect(self.database)
+        migrate(conn)
+        conn.execute("INSERT INTO plans (name, speed, price, data_limit) VALUES ('Basic', '50 Mbps', 20.0, '100 GB')")
+        conn.executemany(
+            'INSERT INTO customers (name, address, phone, email, plan_id, registration_date) '
+            'VALUES (?, ?, ?, ?, 1, ?)',
+            [(f"Customer {i}", "Main Street", "555", "c@example.com", "2024-01-01 00:00:00")
+             for i in range(5)])
+        conn.commit()
+        conn.close()
+    
+    def run_command(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(list(argv))
+        return output.getvalue()
+    
+    def query(self, sql, params=()):
+        conn = sqlite3.connect(self.database)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    
+    def test_billing_run_creates_bills(self):
+        output = self.run_command('billing-run', '2024-02', '2024-02-28')
+        self.assertIn("Generated 5 bills for 2024-02", output)
+        self.assertEqual(self.query(
+            "SELECT COUNT(*), SUM(amount) FROM billing WHERE billing_period='2024-02' AND due_date='2024-02-28'"),
+            [(5, 100.0)])
+    
+    def test_billing_run_rejects_bad_due_date(self):
+        with self.assertRaises(SystemExit) as exit, contextlib.redirect_stderr(io.StringIO()):
+            self.run_command('billing-run', '2024-02', 'someday')
+        self.assertEqual(exit.exception.code, 1)
+        self.assertEqual(self.query('SELECT COUNT(*) FROM billing'), [(0,)])
+    
+    def test_import_of_a_missing_file_fails_cleanly(self):
+        errors = io.StringIO()
+        with self.assertRaises(SystemExit) as exit, contextlib.redirect_stderr(errors):
+            self.run_command('import', 'customers', os.path.join(self.tmp, 'missing.csv'))
+        self.assertEqual(exit.exception.code, 1)
+        self.assertIn("missing.csv", errors.getvalue())
+        self.assertNotIn("Traceback", errors.getvalue())
+    
+    def test_reconcile_of_an_unreadable_file_fails_cleanly(self):
+        errors = io.StringIO()
+        with self.assertRaises(SystemExit) as exit, contextlib.redirect_stderr(errors):
+            self.run_command('reconcile', self.tmp)
+        self.assertEqual(exit.exception.code, 1)
+        self.assertNotIn("Traceback", errors.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
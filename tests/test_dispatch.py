@@ -0,0 +1,58 @@
+# Technician dispatch against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+
+from isp_core import (book_visit, earliest_slot, insert_complaint, insert_customer, insert_technician, migrate,
+                 plan_dispatch, prepare_dispatch)
+
+class PlannerTest(unittest.TestCase):
+    def test_earliest_slot_fits_between_busy_intervals(self):
+        busy = [(60, 120), (180, 240)]
+        self.assertEqual(earliest_slot(busy, 0, 60, 600), 0)
+        self.assertEqual(earliest_slot(busy, 30, 60, 600), 120)
+        self.assertEqual(earliest_slot(busy, 130, 30, 600), 130)
+        self.assertEqual(earliest_slot(busy, 30, 90, 600), 240)
+        self.assertIsNone(earliest_slot(busy, 30, 90, 300))
+    
+    def test_jobs_go_to_whoever_finishes_first(self):
+        technicians = [(10, None, 480, 1020, []), (20, None, 540, 1020, [])]
+        self.assertEqual(plan_dispatch([(1, None), (2, None)], technicians),
+                         ([(1, 10, 510, 570, 30), (2, 20, 570, 630, 30)], []))
+    
+    def test_routes_continue_from_the_last_job(self):
+        home = (51.5, -0.1)
+        technicians = [(10, home, 480, 1020, [(480, 600)]), (20, None, 480, 1020, [])]
+        assignments, unassigned = plan_dispatch([(1, home), (2, home)], technicians)
+        self.assertEqual(assignments, [(1, 20, 510, 570, 30), (2, 20, 570, 630, 0)])
+    
+    def test_jobs_that_fit_nowhere_are_left_unassigned(self):
+        technicians = [(10, None, 480, 560, [])]
+        self.assertEqual(plan_dispatch([(1, None)], technicians), ([], [1]))
+
+class DispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        insert_customer(self.conn, "Customer", "Main Street", "555", "c@example.com", None)
+        insert_technician(self.conn, "Technician", "555", '00:00', '23:59', None, None)
+        insert_complaint(self.conn, 1, "No connection", 'Open')
+    
+    def test_visit_running_past_midnight_blocks_the_next_morning(self):
+        book_visit(self.conn, 1, 1, '2024-03-04 22:00:00', '2024-03-05 02:00:00', "Night repair")
+        assignments, unassigned = prepare_dispatch(self.conn, '2024-03-05')
+        self.assertEqual(unassigned, [])
+        self.assertEqual([assignment[3:5] for assignment in assignments],
+                         [('2024-03-05 02:00:00', '2024-03-05 03:00:00')])
+    
+    def test_visit_running_into_the_next_day_ends_the_free_time(self):
+        book_visit(self.conn, 1, 1, '2024-03-05 00:30:00', '2024-03-05 23:00:00', "Long job")
+        book_visit(self.conn, 1, 1, '2024-03-05 23:30:00', '2024-03-06 03:00:00', "Night repair")
+        assignments, unassigned = prepare_dispatch(self.conn, '2024-03-05')
+        self.assertEqual((assignments, unassigned), ([], [1]))
+
+if __name__ == '__main__':
+    unittest.main()
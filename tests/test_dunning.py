@@ -0,0 +1,65 @@
+# Dunning late fees against a scratch database.
+#
+#   python -m unittest discover tests
+
+import csv
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from isp_core import BillingService, CustomerService, fetch_ar_aging, fetch_revenue, migrate
+
+STAGES = [(1, 0.0, 0.0, 'reminder'), (15, 0.0, 0.05, 'late_fee'), (30, 0.0, 0.10, 'final_notice')]
+
+class DunningTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+    
+    def seed(self):
+        CustomerService(self.conn).add_many([("Customer", "Main Street", "555", "c@example.com", None)])
+        self.billing = BillingService(self.conn)
+        self.billing.add_many([(1, 100.0, '2024-01-01')])
+    
+    def outstanding(self):
+        return sum(amount for bucket, bills, amount in fetch_ar_aging(self.conn, '2024-03-01'))
+    
+    def test_late_fees_are_kept_apart_from_the_amount(self):
+        migrate(self.conn)
+        self.seed()
+        self.assertEqual(self.billing.run_dunning('2024-03-01', STAGES), (1, 1))
+        bill = self.billing.get(1)
+        self.assertEqual((bill.amount, bill.late_fees, bill.dunning_level), (100.0, 15.0, 3))
+        self.assertEqual(fetch_revenue(self.conn, '2024-01'), [("No plan", 1, 100.0, 0, 0.0)])
+        self.assertEqual(self.outstanding(), 115.0)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bank.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows([['customer_id', 'amount', 'reference'], [1, '100.00', 'TX1']])
+            self.assertEqual(self.billing.reconcile(path), (1, 0, None))
+        self.assertEqual(fetch_revenue(self.conn, '2024-01'), [("No plan", 1, 100.0, 1, 100.0)])
+        self.assertEqual(self.outstanding(), 0)
+    
+    def test_paying_a_bill_clears_its_fees_from_what_is_owed(self):
+        migrate(self.conn)
+        self.seed()
+        self.billing.run_dunning('2024-03-01', STAGES)
+        self.billing.pay_many([1])
+        self.assertEqual(fetch_revenue(self.conn, '2024-01'), [("No plan", 1, 100.0, 1, 100.0)])
+        self.assertEqual(self.outstanding(), 0)
+    
+    def test_unreadable_due_dates_are_not_dunned(self):
+        migrate(self.conn, target=12)
+        self.conn.execute('INSERT INTO customers (name, address, phone, email) '
+                          "VALUES ('Customer', 'Main Street', '555', 'c@example.com')")
+        self.conn.execute("INSERT INTO billing (customer_id, amount, due_date) VALUES (1, 100.0, '05 Jan 2024')")
+        self.conn.commit()
+        migrate(self.conn)
+        self.billing = BillingService(self.conn)
+        self.assertEqual(self.billing.run_dunning('2024-03-01', STAGES), (0, 0))
+        self.assertEqual(self.billing.get(1).late_fees, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Bulk import of customers and plans against a scratch database.
+#
+#   python -m unittest discover tests
+
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from isp_core import import_records, migrate
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'records.jsonl')
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO plans (name, speed, price) VALUES ('Basic', '50 Mbps', 20.0)")
+        self.conn.commit()
+    
+    def import_lines(self, table, records):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+        return import_records(self.conn, table, self.path)
+    
+    def rejects(self):
+        with open(self.path + '.rejects.csv', newline='', encoding='utf-8') as f:
+            return [(int(row['line']), row['error']) for row in csv.DictReader(f)]
+    
+    def test_customers_with_unusable_values_are_rejected(self):
+        customer = {'name': "Customer", 'address': "Main Street", 'phone': 5551234, 'email': "c@example.com"}
+        imported, rejected, _ = self.import_lines('customers', [
+            customer,
+            dict(customer, plan_id=[1]),
+            dict(customer, name={'x': 1}),
+            dict(customer, plan_id=1),
+        ])
+        self.assertEqual((imported, rejected), (2, 2))
+        self.assertEqual(self.rejects(), [(2, "Plan id must be a whole number"), (3, "Name must be text")])
+        self.assertEqual(self.conn.execute('SELECT phone, plan_id FROM customers').fetchall(),
+                         [('5551234', None), ('5551234', 1)])
+    
+    def test_plans_with_unusable_values_are_rejected(self):
+        imported, rejected, _ = self.import_lines('plans', [
+            {'name': "Fibre", 'speed': "1 Gbps", 'price': [1]},
+            {'name': "Fibre", 'speed': "1 Gbps", 'price': 60, 'data_limit': ["1 TB"]},
+            {'name': "Fibre", 'speed': "1 Gbps", 'price': 60, 'data_limit': "1 TB"},
+        ])
+        self.assertEqual((imported, rejected), (1, 2))
+        self.assertEqual(self.rejects(), [(1, "Price must be a valid number"), (2, "Data limit must be text")])
+
+if __name__ == '__main__':
+    unittest.main()
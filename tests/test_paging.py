@@ -0,0 +1,178 @@
+# Keyset paging, sorting and filtering of the grids against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from ISP_SYSTEM import CUSTOMER_SORT_COLUMNS, ISPAutomationSystem, PagedTreeview
+from isp_core import insert_bill, insert_customer, insert_plan, migrate, pay_bill
+
+class FakeTree:
+    # Just enough of ttk.Treeview for PagedTreeview
+    def __init__(self, columns):
+        self.rows = {}
+        self.order = []
+        self.headings = {column: column.title() for column in columns}
+    
+    def heading(self, column, option=None, text=None, command=None):
+        if option == 'text':
+            return self.headings[column]
+        if text is not None:
+            self.headings[column] = text
+    
+    def configure(self, **options):
+        pass
+    
+    def bind(self, sequence, func, add=None):
+        pass
+    
+    def insert(self, parent, index, iid, values, tags=()):
+        self.rows[iid] = values
+        self.order.append(iid)
+    
+    def delete(self, *iids):
+        for iid in iids:
+            del self.rows[iid]
+            self.order.remove(iid)
+    
+    def get_children(self):
+        return list(self.order)
+    
+    def exists(self, iid):
+        return iid in self.rows
+    
+    def item(self, iid, values, tags=()):
+        self.rows[iid] = values
+    
+    def index(self, iid):
+        return self.order.index(iid)
+
+class FakeScrollbar:
+    def set(self, first, last):
+        pass
+
+class FakeExecutor:
+    # Runs every query at once on the calling thread
+    def __init__(self, conn):
+        self.conn = conn
+        self.queries = []
+    
+    def submit(self, fn, *args, label=None, callback=None, errback=None):
+        self.queries.append(args)
+        result = fn(self.conn, *args)
+        if callback:
+            callback(result)
+
+class PagingTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        self.conn.execute('CREATE TABLE items (item_id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL)')
+        self.conn.execute('CREATE INDEX idx_items_price ON items(price)')
+        self.rows = [(i, f"Item {i:02d}", float(i * 7 % 5)) for i in range(1, 26)]
+        self.conn.executemany('INSERT INTO items VALUES (?, ?, ?)', self.rows)
+        self.tree = FakeTree(['id', 'name', 'price'])
+        self.db = FakeExecutor(self.conn)
+        self.pager = PagedTreeview(
+            self.tree, FakeScrollbar(), self.db, "items", 'SELECT item_id, name, price FROM items', 'item_id',
+            page_size=10, sort_columns={'id': ('item_id', 0), 'price': ('price', 2)})
+    
+    def load_all(self):
+        while not self.pager.exhausted:
+            self.pager.on_scroll('0.0', '1.0')
+        return [int(iid) for iid in self.tree.get_children()]
+    
+    def test_pages_follow_the_key(self):
+        self.pager.reset()
+        self.assertEqual(len(self.tree.get_children()), 10)
+        self.assertEqual(self.load_all(), list(range(1, 26)))
+        # Each later page starts after the last key read, not at an offset
+        self.assertEqual([params[-2:] for sql, params in self.db.queries],
+                         [[10], [10, 10], [20, 10]])
+    
+    def test_sorting_pages_through_ties(self):
+        self.pager.sort_by('price')
+        by_price = [row[0] for row in sorted(self.rows, key=lambda row: (row[2], row[0]))]
+        self.assertEqual(self.load_all(), by_price)
+        self.assertEqual(self.tree.headings['price'], 'Price \u25b2')
+        
+        self.pager.sort_by('price')
+        self.assertEqual(self.load_all(), by_price[::-1])
+        self.assertEqual(self.tree.headings['price'], 'Price \u25bc')
+        self.assertEqual(self.tree.headings['id'], 'Id')
+    
+    def test_filter_applies_to_every_page(self):
+        self.pager.sort_by('price')
+        self.pager.filter([('price >= ?', (2,)), ('name <> ?', ("Item 05",))])
+        expected = [row[0] for row in sorted(self.rows, key=lambda row: (row[2], row[0]))
+                    if row[2] >= 2 and row[0] != 5]
+        self.assertEqual(self.load_all(), expected)
+        self.assertFalse(self.pager.is_ordered())
+    
+    def test_customers_without_plan_or_registration_date_sort_first(self):
+        conn = sqlite3.connect(':memory:')
+        self.addCleanup(conn.close)
+        migrate(conn)
+        insert_plan(conn, "Basic", "50 Mbps", 20.0, "500 GB", "")
+        insert_plan(conn, "Fast", "200 Mbps", 40.0, "Unlimited", "")
+        for i in range(1, 16):
+            insert_customer(conn, f"Customer {i:02d}", "Main Street", "555", f"c{16 - i:02d}@example.com",
+                            (None, 1, 2)[i % 3])
+        conn.execute("UPDATE customers SET registration_date = NULL WHERE customer_id % 4 = 0")
+        tree = FakeTree(['id', 'name', 'address', 'phone', 'email', 'plan', 'registered', 'plan_id'])
+        pager = PagedTreeview(
+            tree, FakeScrollbar(), FakeExecutor(conn), "customers", '''
+            SELECT c.customer_id, c.name, c.address, c.phone, c.email, p.name,
+                   COALESCE(c.registration_date, ''), COALESCE(c.plan_id, 0)
+            FROM customers c LEFT JOIN plans p ON c.plan_id = p.plan_id
+            ''', 'c.customer_id', page_size=4, sort_columns=CUSTOMER_SORT_COLUMNS)
+        rows = conn.execute('''
+            SELECT customer_id, email, COALESCE(registration_date, ''), COALESCE(plan_id, 0) FROM customers
+            ''').fetchall()
+        for column, index in [('email', 1), ('registered', 2), ('plan', 3)]:
+            pager.sort_by(column)
+            expected = [row[0] for row in sorted(rows, key=lambda row: (row[index], row[0]))]
+            while not pager.exhausted:
+                pager.on_scroll('0.0', '1.0')
+            self.assertEqual([int(iid) for iid in tree.get_children()], expected, column)
+        
+        plan = conn.execute('''
+            EXPLAIN QUERY PLAN SELECT customer_id FROM customers
+            WHERE COALESCE(plan_id, 0) >= ? ORDER BY COALESCE(plan_id, 0)
+            ''', (1,)).fetchall()
+        self.assertIn('idx_customers_plan_sort', plan[0][-1])
+    
+    def test_bill_status_filters_match_the_status_column(self):
+        conn = sqlite3.connect(':memory:')
+        self.addCleanup(conn.close)
+        migrate(conn)
+        insert_customer(conn, "Customer", "Main Street", "555", "c@example.com", None)
+        today = date.today()
+        for days in (-3, -1, 0, 2, -2):
+            insert_bill(conn, 1, 20.0, (today + timedelta(days=days)).isoformat())
+        pay_bill(conn, 5)
+        statuses = dict(conn.execute('''
+            SELECT b.bill_id, CASE WHEN b.paid = 1 THEN 'Paid'
+                                   WHEN b.due_date < date('now', 'localtime') THEN 'Overdue'
+                                   ELSE 'Unpaid' END
+            FROM billing b
+            '''))
+        for status in ("Paid", "Unpaid", "Overdue", "All"):
+            applied = []
+            form = SimpleNamespace(read_date_range=lambda start, end: [None, None],
+                                   bill_from_filter=None, bill_to_filter=None,
+                                   bill_status_filter=SimpleNamespace(get=lambda: status),
+                                   bills_pager=SimpleNamespace(filter=applied.append))
+            ISPAutomationSystem.apply_bill_filters(form)
+            where = ' AND '.join(['1'] + [condition for condition, params in applied[0]])
+            params = [param for condition, params in applied[0] for param in params]
+            found = [row[0] for row in conn.execute(f'SELECT b.bill_id FROM billing b WHERE {where} ORDER BY 1',
+                                                    params)]
+            self.assertEqual(found, [bill for bill, shown in sorted(statuses.items()) if status in (shown, "All")],
+                             status)
+
+if __name__ == '__main__':
+    unittest.main()
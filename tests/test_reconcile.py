@@ -0,0 +1,50 @@
+# Bank statement reconciliation against a scratch database.
+#
+#   python -m unittest discover tests
+
+import csv
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from isp_core import BillingService, CustomerService, migrate
+
+class ReconcileTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'bank.csv')
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        CustomerService(self.conn).add_many([("Customer", "Main Street", "555", "c@example.com", None)] * 2)
+        self.billing = BillingService(self.conn)
+        self.billing.add_many([(1, 20.0, '2026-01-01'), (2, 30.0, '2026-01-01')])
+    
+    def reconcile(self, rows):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['customer_id', 'amount', 'reference', 'date'])
+            writer.writerows(rows)
+        return self.billing.reconcile(self.path)
+    
+    def exceptions(self):
+        with open(self.path + '.exceptions.csv', newline='', encoding='utf-8') as f:
+            return [(int(row['line']), row['error']) for row in csv.DictReader(f)]
+    
+    def test_non_finite_amounts_are_exceptions(self):
+        matched, exceptions, _ = self.reconcile([
+            [1, 'inf', 'R1', ''], [1, 'nan', 'R1', ''], [1, '1e400', 'R1', ''], [1, '20', 'R1', '']])
+        self.assertEqual((matched, exceptions), (1, 3))
+        self.assertEqual(self.exceptions(), [(line, "Amount must be a valid number") for line in (2, 3, 4)])
+    
+    def test_failed_line_does_not_use_up_its_reference(self):
+        matched, exceptions, _ = self.reconcile([
+            [1, '99', 'R1', ''], [1, '20', 'R1', ''], [2, '30', 'R2', 'bad'], [2, '30', 'R2', '']])
+        self.assertEqual((matched, exceptions), (2, 2))
+        self.assertEqual([(bill.paid, bill.payment_reference) for bill in self.billing.scan()],
+                         [(1, 'R1'), (1, 'R2')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+# Full-text search of customers against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+
+from isp_core import fts_query, insert_customer, migrate, modify_customer, remove_customer
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        insert_customer(self.conn, "Asha Verma", "12 Mall Road", "555 0101", "asha@example.com", None)
+        insert_customer(self.conn, "Ravi Kumar", "4 Lake View", "555 0202", "ravi@example.com", None)
+    
+    def search(self, text):
+        return [row[0] for row in self.conn.execute(
+            'SELECT rowid FROM customers_fts WHERE customers_fts MATCH ? ORDER BY rowid', (fts_query(text),))]
+    
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(fts_query('as "v'), '"as"* """v"*')
+        self.assertIsNone(fts_query(' a '))
+        self.assertEqual(self.search('ash ver'), [1])
+        self.assertEqual(self.search('555'), [1, 2])
+        self.assertEqual(self.search('ash lake'), [])
+    
+    def test_index_follows_changes(self):
+        modify_customer(self.conn, 2, "Ravi Kumar", "9 Hill Street", "555 0202", "ravi@example.com", None)
+        self.assertEqual(self.search('lake'), [])
+        self.assertEqual(self.search('hill'), [2])
+        remove_customer(self.conn, 1)
+        self.assertEqual(self.search('555'), [2])
+
+if __name__ == '__main__':
+    unittest.main()
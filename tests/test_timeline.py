@@ -0,0 +1,38 @@
+# Dashboard timeline ordering against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+
+from isp_core import fetch_timeline, migrate, pay_bill
+
+class TimelineTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+    
+    def test_payments_are_ordered_by_the_time_they_were_recorded(self):
+        migrate(self.conn)
+        self.conn.execute('INSERT INTO customers (name, address, phone, email, registration_date) '
+                          "VALUES ('Customer', 'Main Street', '555', 'c@example.com', '2000-01-01 00:00:00')")
+        self.conn.execute("INSERT INTO billing (customer_id, amount, due_date, created_at) "
+                          "VALUES (1, 20.0, '2000-02-01', '2000-01-01 09:00:00')")
+        self.conn.commit()
+        pay_bill(self.conn, 1)
+        self.conn.execute("UPDATE billing SET created_at = date(paid_at) || ' 00:00:01'")
+        self.conn.commit()
+        self.assertEqual([row[3] for row in fetch_timeline(self.conn)[:2]], ['Bill Paid', 'Bill Generated'])
+    
+    def test_payments_made_before_paid_at_existed_keep_their_date(self):
+        migrate(self.conn, target=7)
+        self.conn.execute('INSERT INTO customers (name, address, phone, email, registration_date) '
+                          "VALUES ('Customer', 'Main Street', '555', 'c@example.com', '2000-01-01 00:00:00')")
+        self.conn.execute("INSERT INTO billing (customer_id, amount, due_date, paid, payment_date) "
+                          "VALUES (1, 20.0, '2000-02-01', 1, '2000-01-05')")
+        self.conn.commit()
+        migrate(self.conn)
+        self.assertEqual(fetch_timeline(self.conn)[0][:4], ('2000-01-05 00:00:00', 1, 1, 'Bill Paid'))
+
+if __name__ == '__main__':
+    unittest.main()
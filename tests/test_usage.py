@@ -0,0 +1,51 @@
+# Usage metering and plan data limits against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+
+from isp_core import CustomerService, PlanService, UsageMeter, migrate
+
+class UsageTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+    
+    def count(self, table, customer_id):
+        return self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE customer_id=?', (customer_id,)).fetchone()[0]
+    
+    def test_removing_a_customer_removes_their_usage(self):
+        migrate(self.conn)
+        PlanService(self.conn).add("Basic", "50 Mbps", 20.0, "1 GB")
+        customers = CustomerService(self.conn)
+        customers.add_many([("Customer", "Main Street", "555", "c@example.com", 1)] * 2)
+        meter = UsageMeter(self.conn)
+        for customer_id in (1, 2):
+            meter.add(str(customer_id), '2024-02-01 10:15:00', '2000000000', '0')
+            meter.add(str(customer_id), '2024-02-02 23:59:59', '10', '10')
+        self.assertEqual(meter.flush(), 2)
+        
+        customers.remove(1)
+        for table in ('usage_hourly', 'usage_daily', 'usage_alerts'):
+            self.assertEqual((self.count(table, 1), self.count(table, 2) > 0), (0, True), table)
+    
+    def test_free_text_data_limits_are_normalized(self):
+        migrate(self.conn, target=16)
+        self.conn.executemany('INSERT INTO plans (name, speed, price, data_limit, description) VALUES (?, ?, ?, ?, ?)', [
+            ("Fair use", "50 Mbps", 20.0, "100GB FUP", "Home"),
+            ("Bare", "50 Mbps", 20.0, "10", ""),
+            ("Capped", "50 Mbps", 20.0, "500 GB", "Home"),
+            ("Open", "50 Mbps", 20.0, "Unlimited", ""),
+        ])
+        self.conn.commit()
+        migrate(self.conn)
+        self.assertEqual(self.conn.execute('SELECT data_limit, description FROM plans ORDER BY plan_id').fetchall(), [
+            ("100 GB", "Home; Data limit: 100GB FUP"),
+            ("", "Data limit: 10"),
+            ("500 GB", "Home"),
+            ("Unlimited", ""),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# Form and service validation of customers, plans and bills.
+#
+#   python -m unittest discover tests
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import ISP_SYSTEM
+from isp_core import modify_customer, validate_bill, validate_plan
+
+class ValidationTest(unittest.TestCase):
+    def test_prices_must_be_finite_and_not_negative(self):
+        for price, error in [('nan', "Price must be a valid number"), ('inf', "Price must be a valid number"),
+                             ('1e400', "Price must be a valid number"), ('-5', "Price cannot be negative")]:
+            with self.assertRaisesRegex(ValueError, error):
+                validate_plan("Basic", "50 Mbps", price)
+        self.assertEqual(validate_plan("Free", "1 Mbps", '0')[2], 0.0)
+    
+    def test_amounts_must_be_finite_and_not_negative(self):
+        for amount, error in [('nan', "Amount must be a valid number"), ('-inf', "Amount must be a valid number"),
+                              (None, "Please fill all required fields"), ('-0.01', "Amount cannot be negative")]:
+            with self.assertRaisesRegex(ValueError, error):
+                validate_bill(1, amount, '2024-02-01')
+        self.assertEqual(validate_bill('1', '20.5', '2024-02-01'), (1, 20.5, '2024-02-01'))
+    
+    def test_updated_customers_are_validated_like_new_ones(self):
+        def field(value):
+            return SimpleNamespace(get=lambda: value)
+        submitted = []
+        form = SimpleNamespace(
+            customers_tree=SimpleNamespace(selection=lambda: ['7'], item=lambda iid: {'values': [7]}),
+            customer_name=field("Customer"), customer_address=field("Main Street"),
+            customer_phone=field("555"), customer_email=field(""), customer_plan=field("2 - Basic"),
+            db=SimpleNamespace(submit=lambda *args, **kwargs: submitted.append(args)))
+        with mock.patch.object(ISP_SYSTEM, 'messagebox') as messagebox:
+            ISP_SYSTEM.ISPAutomationSystem.update_customer(form)
+            messagebox.showerror.assert_called_once_with("Error", "Please fill all required fields")
+            self.assertEqual(submitted, [])
+            
+            form.customer_email = field("c@example.com")
+            ISP_SYSTEM.ISPAutomationSystem.update_customer(form)
+        self.assertEqual(submitted, [(modify_customer, 7, "Customer", "Main Street", "555", "c@example.com", 2)])
+
+if __name__ == '__main__':
+    unittest.main()
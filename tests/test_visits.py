@@ -0,0 +1,47 @@
+# Technician double booking checks against a scratch database.
+#
+#   python -m unittest discover tests
+
+import sqlite3
+import unittest
+
+from isp_core import book_visit, insert_customer, insert_technician, migrate
+
+class VisitTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        migrate(self.conn)
+        insert_customer(self.conn, "Customer", "Main Street", "555", "c@example.com", None)
+        for name in ("First", "Second"):
+            insert_technician(self.conn, name, "555", '08:00', '17:00', None, None)
+        book_visit(self.conn, 1, 1, '2024-03-05 10:00:00', '2024-03-05 12:00:00', "Router")
+    
+    def visits(self):
+        return self.conn.execute('SELECT technician_id, start_at, end_at FROM visits ORDER BY visit_id').fetchall()
+    
+    def test_overlapping_visits_are_rejected(self):
+        for start_at, end_at in [('2024-03-05 11:00:00', '2024-03-05 13:00:00'),
+                                 ('2024-03-05 09:00:00', '2024-03-05 10:30:00'),
+                                 ('2024-03-05 09:00:00', '2024-03-05 13:00:00'),
+                                 ('2024-03-05 10:30:00', '2024-03-05 11:00:00')]:
+            with self.assertRaisesRegex(ValueError, "already booked"):
+                book_visit(self.conn, 1, 1, start_at, end_at, "Cabling")
+        self.assertEqual(len(self.visits()), 1)
+    
+    def test_adjacent_visits_and_other_technicians_are_allowed(self):
+        book_visit(self.conn, 1, 1, '2024-03-05 12:00:00', '2024-03-05 13:00:00', "Cabling")
+        book_visit(self.conn, 1, 1, '2024-03-05 09:00:00', '2024-03-05 10:00:00', "Cabling")
+        book_visit(self.conn, 2, 1, '2024-03-05 10:00:00', '2024-03-05 12:00:00', "Cabling")
+        self.assertEqual(len(self.visits()), 4)
+    
+    def test_moving_a_visit_onto_another_is_rejected(self):
+        book_visit(self.conn, 2, 1, '2024-03-05 10:00:00', '2024-03-05 12:00:00', "Cabling")
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute('UPDATE visits SET technician_id = 1 WHERE visit_id = 2')
+        # A visit can still be moved within its own slot
+        self.conn.execute("UPDATE visits SET end_at = '2024-03-05 11:00:00' WHERE visit_id = 1")
+        self.assertEqual(self.visits()[0], (1, '2024-03-05 10:00:00', '2024-03-05 11:00:00'))
+
+if __name__ == '__main__':
+    unittest.main()